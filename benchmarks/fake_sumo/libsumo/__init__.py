@@ -0,0 +1,51 @@
+# benchmarks/fake_sumo/libsumo/__init__.py
+
+"""
+In-process stand-in for libsumo, running the fake traci simulation. As in the real
+(SWIG-generated) libsumo, the module itself serves as the connection and its domains
+(simulation, vehicle, trafficlight) are classes with static methods, not instances.
+A single simulation runs per process.
+"""
+
+import traci
+from traci.exceptions import TraCIException
+
+_simulation = None
+
+def _current():
+    if _simulation is None:
+        raise TraCIException("No simulation is loaded.")
+    return _simulation
+
+def start(sumo_cmd, **kwargs):
+    global _simulation
+    if _simulation is not None:
+        raise TraCIException("A simulation is already loaded.")
+    _simulation = traci.Connection(sumo_cmd, "libsumo")
+    return 21, "fake libsumo"
+
+def load(args):
+    _current().load(args)
+
+def simulationStep(step=0.0):
+    _current().simulationStep(step)
+
+def close():
+    global _simulation
+    _simulation = None
+
+def _forward(domain, method):
+    def call(*args, **kwargs):
+        return getattr(getattr(_current(), domain), method)(*args, **kwargs)
+    call.__name__ = method
+    return staticmethod(call)
+
+def _domain_class(domain, source):
+    """Returns a class whose static methods forward to the `domain` of the current simulation."""
+    methods = {name: _forward(domain, name) for name in vars(source) if not name.startswith('_')}
+    return type(domain, (), methods)
+
+simulation = _domain_class('simulation', traci._SimulationDomain)
+simulation.isLoaded = staticmethod(lambda: _simulation is not None)
+vehicle = _domain_class('vehicle', traci._VehicleDomain)
+trafficlight = _domain_class('trafficlight', traci._TrafficLightDomain)
@@ -0,0 +1 @@
+# benchmarks/fake_sumo/sumolib/__init__.py
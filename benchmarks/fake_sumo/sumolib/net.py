@@ -0,0 +1,5 @@
+# benchmarks/fake_sumo/sumolib/net.py
+
+def readNet(net_file):
+    """The benchmarks never generate scenarios, so network parsing is not available."""
+    raise NotImplementedError("sumolib is not available in the benchmark environment.")
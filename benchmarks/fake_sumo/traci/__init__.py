@@ -0,0 +1,241 @@
+# benchmarks/fake_sumo/traci/__init__.py
+
+"""
+Deterministic stand-in for the parts of TraCI used by sumo_simulation, for benchmarks.
+
+Vehicle i departs at i / departure_rate seconds and travels for `travel_time` seconds
+plus a delay that grows with the distance of the green times from `target_green`,
+waiting during that delay. The traffic light programs come from the ga_tls.add.xml
+file on the command line or from setCompleteRedYellowGreenDefinition. Nothing is
+random, so two runs with the same chromosome give the same fitness.
+
+Every command that would be a round trip to a real SUMO server busy-waits for
+`call_latency` seconds, so that the number of TraCI calls shows in the timings.
+Subscription results arrive with the simulation step and cost nothing extra, as in
+TraCI. The libsumo stand-in runs in-process and has no latency.
+"""
+
+import copy
+import heapq
+import pickle
+import time
+import xml.etree.ElementTree as ET
+from . import constants as tc
+from .exceptions import TraCIException, FatalTraCIError
+
+SETTINGS = {
+    'num_tls': 2,  # Traffic lights J0..J<n-1>, each with two green phases
+    'vehicles': 250,
+    'departure_rate': 0.25,  # Departures per simulated second
+    'travel_time': 60.0,  # Seconds a vehicle needs without delay
+    'target_green': 40.0,  # Green duration (per phase) with the smallest delay
+    'call_latency': 0.0,  # Seconds per TraCI round trip of connections opened by start()
+}
+
+# Total latency waited for in this process, to tell it apart from the CPU time of a benchmark.
+STATS = {'latency_seconds': 0.0}
+
+def configure(**settings):
+    """Changes the synthetic traffic, e.g. configure(vehicles=5000, departure_rate=5.0)."""
+    unknown = set(settings) - set(SETTINGS)
+    if unknown:
+        raise ValueError(f"Unknown settings: {', '.join(sorted(unknown))}")
+    SETTINGS.update(settings)
+
+class Phase:
+    def __init__(self, duration, state, minDur=-1, maxDur=-1, next=(), name=""):
+        self.duration = duration
+        self.state = state
+        self.minDur = minDur
+        self.maxDur = maxDur
+        self.next = next
+        self.name = name
+
+class Logic:
+    def __init__(self, programID, type, currentPhaseIndex, phases=None, subParameter=None):
+        self.programID = programID
+        self.type = type
+        self.currentPhaseIndex = currentPhaseIndex
+        self.phases = phases or []
+        self.subParameter = subParameter or {}
+
+class trafficlight:
+    """Namespace mirroring traci.trafficlight for Phase and Logic."""
+    Phase = Phase
+    Logic = Logic
+
+def default_logics():
+    """Returns the baseline program of every traffic light."""
+    return {
+        f"J{k}": Logic("0", 0, 0, [Phase(30, "GGrr"), Phase(3, "yyrr"), Phase(30, "rrGG"), Phase(3, "rryy")])
+        for k in range(SETTINGS['num_tls'])
+    }
+
+def _round_trip(method):
+    """Makes `method` cost the call latency of its connection before it runs."""
+    def call(self, *args, **kwargs):
+        sim = getattr(self, '_sim', self)
+        if sim.call_latency:
+            STATS['latency_seconds'] += sim.call_latency
+            deadline = time.perf_counter() + sim.call_latency
+            while time.perf_counter() < deadline:
+                pass
+        return method(self, *args, **kwargs)
+    call.__name__ = method.__name__
+    return call
+
+class _Domain:
+    def __init__(self, sim):
+        self._sim = sim
+
+class _TrafficLightDomain(_Domain):
+    def getIDList(self):
+        return list(self._sim.logics)
+
+    def getCompleteRedYellowGreenDefinition(self, tls_id):
+        return [copy.deepcopy(self._sim.logics[tls_id])]
+
+    def setCompleteRedYellowGreenDefinition(self, tls_id, logic):
+        self._sim.logics[tls_id] = copy.deepcopy(logic)
+        self._sim.update_delay()
+
+    def setProgram(self, tls_id, program_id):
+        pass
+
+class _SimulationDomain(_Domain):
+    def getTime(self):
+        return self._sim.time
+
+    def getDepartedIDList(self):
+        return list(self._sim.departed)
+
+    def getArrivedIDList(self):
+        return list(self._sim.arrived)
+
+    def getMinExpectedNumber(self):
+        return SETTINGS['vehicles'] - self._sim.next_vehicle + len(self._sim.live)
+
+    def subscribe(self, var_ids):
+        self._sim.simulation_subscription = list(var_ids)
+
+    def getSubscriptionResults(self):
+        values = {
+            tc.VAR_TIME: self._sim.time,
+            tc.VAR_DEPARTED_VEHICLES_IDS: list(self._sim.departed),
+            tc.VAR_ARRIVED_VEHICLES_IDS: list(self._sim.arrived),
+            tc.VAR_MIN_EXPECTED_VEHICLES: self.getMinExpectedNumber(),
+        }
+        return {var_id: values[var_id] for var_id in self._sim.simulation_subscription}
+
+    def saveState(self, path):
+        sim = self._sim
+        with open(path, 'wb') as f:
+            pickle.dump((sim.time, sim.next_vehicle, sim.live, sim.arrivals), f)
+
+    def loadState(self, path):
+        sim = self._sim
+        with open(path, 'rb') as f:
+            sim.time, sim.next_vehicle, sim.live, sim.arrivals = pickle.load(f)
+        sim.vehicle_subscriptions = set()
+
+class _VehicleDomain(_Domain):
+    def getIDList(self):
+        return list(self._sim.live)
+
+    def getAccumulatedWaitingTime(self, veh_id):
+        return self._sim.waiting_time(veh_id)
+
+    def subscribe(self, veh_id, var_ids):
+        self._sim.vehicle_subscriptions.add(veh_id)
+
+    def getAllSubscriptionResults(self):
+        sim = self._sim
+        return {veh_id: {tc.VAR_ACCUMULATED_WAITING_TIME: sim.waiting_time(veh_id)}
+                for veh_id in sim.vehicle_subscriptions}
+
+# Subscription results come back with the simulation step, so reading them is local.
+_LOCAL_METHODS = {'getSubscriptionResults', 'getAllSubscriptionResults'}
+for _domain in (_TrafficLightDomain, _SimulationDomain, _VehicleDomain):
+    for _name, _method in list(vars(_domain).items()):
+        if not _name.startswith('_') and _name not in _LOCAL_METHODS:
+            setattr(_domain, _name, _round_trip(_method))
+
+class Connection:
+    """One fake simulation, reset by load() like a real SUMO instance."""
+
+    def __init__(self, sumo_cmd, label, call_latency=0.0):
+        self.label = label
+        self.call_latency = call_latency
+        self.trafficlight = _TrafficLightDomain(self)
+        self.simulation = _SimulationDomain(self)
+        self.vehicle = _VehicleDomain(self)
+        self._reset(sumo_cmd)
+
+    def _reset(self, sumo_cmd):
+        self.step_length = float(sumo_cmd[sumo_cmd.index("--step-length") + 1]) if "--step-length" in sumo_cmd else 1.0
+        self.logics = default_logics()
+        if "--additional-files" in sumo_cmd:
+            for path in sumo_cmd[sumo_cmd.index("--additional-files") + 1].split(","):
+                if path.endswith("ga_tls.add.xml"):
+                    self._read_programs(path)
+        self.time = 0.0
+        self.next_vehicle = 0
+        self.live = {}  # veh_id -> depart time
+        self.arrivals = []  # heap of (arrival time, veh_id)
+        self.departed = []
+        self.arrived = []
+        self.simulation_subscription = []
+        self.vehicle_subscriptions = set()
+        self.update_delay()
+
+    def _read_programs(self, path):
+        for tl_logic in ET.parse(path).getroot():
+            phases = [Phase(float(phase.get("duration")), phase.get("state")) for phase in tl_logic]
+            self.logics[tl_logic.get("id")] = Logic(tl_logic.get("programID"), 0, 0, phases)
+
+    def update_delay(self):
+        greens = [phase.duration for logic in self.logics.values() for phase in logic.phases if 'G' in phase.state]
+        target = SETTINGS['target_green']
+        self.delay = 2.0 * sum(abs(green - target) for green in greens) / max(1, len(greens))
+
+    def waiting_time(self, veh_id):
+        return min(self.time - self.live[veh_id], self.delay)
+
+    @_round_trip
+    def simulationStep(self, step=0.0):
+        self.time = round(self.time + self.step_length, 6)
+        self.departed, self.arrived = [], []
+        rate, vehicles = SETTINGS['departure_rate'], SETTINGS['vehicles']
+        while self.next_vehicle < vehicles and self.next_vehicle / rate <= self.time:
+            veh_id = f"veh_{self.next_vehicle}"
+            self.live[veh_id] = self.time
+            # A small deterministic spread keeps trips from arriving in lockstep.
+            travel_time = SETTINGS['travel_time'] + self.delay + (self.next_vehicle * 7919) % 13
+            heapq.heappush(self.arrivals, (self.time + travel_time, veh_id))
+            self.departed.append(veh_id)
+            self.next_vehicle += 1
+        while self.arrivals and self.arrivals[0][0] <= self.time:
+            _, veh_id = heapq.heappop(self.arrivals)
+            del self.live[veh_id]
+            self.vehicle_subscriptions.discard(veh_id)
+            self.arrived.append(veh_id)
+
+    @_round_trip
+    def load(self, args):
+        self._reset([None] + list(args))
+
+    def close(self):
+        _connections.pop(self.label, None)
+
+_connections = {}
+
+def start(sumo_cmd, port=None, label="default", **kwargs):
+    if label in _connections:
+        raise TraCIException(f"Connection '{label}' is already active.")
+    _connections[label] = Connection(sumo_cmd, label, SETTINGS['call_latency'])
+    return 21, "fake SUMO"
+
+def getConnection(label="default"):
+    if label not in _connections:
+        raise TraCIException(f"Connection '{label}' is not known.")
+    return _connections[label]
@@ -0,0 +1,8 @@
+# benchmarks/fake_sumo/traci/constants.py
+
+# Same values as traci.constants.
+VAR_TIME = 0x66
+VAR_DEPARTED_VEHICLES_IDS = 0x74
+VAR_ARRIVED_VEHICLES_IDS = 0x7a
+VAR_MIN_EXPECTED_VEHICLES = 0x7d
+VAR_ACCUMULATED_WAITING_TIME = 0x87
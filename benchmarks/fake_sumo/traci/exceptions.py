@@ -0,0 +1,7 @@
+# benchmarks/fake_sumo/traci/exceptions.py
+
+class TraCIException(Exception):
+    pass
+
+class FatalTraCIError(Exception):
+    pass
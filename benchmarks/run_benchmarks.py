@@ -0,0 +1,348 @@
+# benchmarks/run_benchmarks.py
+
+"""
+Throughput benchmarks of the GA operators, the fitness function, chromosome storage and
+of complete evaluations and generations, without SUMO: evaluations run against the
+deterministic TraCI stand-in in benchmarks/fake_sumo.
+
+    python benchmarks/run_benchmarks.py                     # run and compare with baseline.json
+    python benchmarks/run_benchmarks.py --quick             # smaller sizes
+    python benchmarks/run_benchmarks.py --update-baseline   # store the results as the new baseline
+
+Results are compared with benchmarks/baseline.json, which holds one baseline per mode;
+the exit status is 1 if a result is worse than its baseline by more than --tolerance,
+so the script can gate a pipeline.
+
+Every timing is followed by one of a reference workload (the bare fake simulation), and
+the CPU time of a result is stored as a cost in reference steps, which does not depend
+on the speed of the machine. The TraCI call latency of the fake is wall time on every
+machine, so it is kept apart and not scaled.
+"""
+
+import argparse
+import collections
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+FAKE_SUMO_DIR = os.path.join(BENCHMARK_DIR, "fake_sumo")
+BASELINE_FILE = os.path.join(BENCHMARK_DIR, "baseline.json")
+
+# The fake traci and sumolib packages must shadow any installed ones.
+sys.path[:0] = [FAKE_SUMO_DIR, REPO_DIR]
+os.environ.setdefault("SUMO_HOME", FAKE_SUMO_DIR)
+
+import traci
+
+# One timing of a benchmark: its seconds per call, the reference steps/s timed right after
+# it, the fixed (latency) part of the seconds and the cost of the rest in reference steps.
+Timing = collections.namedtuple('Timing', 'seconds reference fixed cost')
+
+def measure(func, repeat=7, min_time=0.2, fixed=0.0):
+    """
+    Times func() `repeat` times, each followed by a timing of the reference workload, and
+    returns the Timing with the median cost. Each timing calls its function often enough
+    to last at least `min_time` seconds; the garbage collector is paused meanwhile, as in
+    timeit. `fixed` is the part of a call spent waiting for the (fake) TraCI latency.
+    """
+    number = _calls_per_timing(func, min_time)
+    reference_number = _calls_per_timing(reference_workload, min_time)
+    timings = []
+    for _ in range(repeat):
+        seconds = _timed_calls(func, number) / number
+        reference = reference_workload.steps * reference_number / _timed_calls(reference_workload, reference_number)
+        timings.append(Timing(seconds, reference, fixed, (seconds - fixed) * reference))
+    return sorted(timings, key=lambda timing: timing.cost)[repeat // 2]
+
+def _calls_per_timing(func, min_time):
+    number = 1
+    while True:
+        seconds = _timed_calls(func, number)
+        if seconds >= min_time:
+            return number
+        number = max(number * 2, int(number * min_time / max(seconds, 1e-9)))
+
+def _timed_calls(func, number):
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        return time.perf_counter() - start
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+def prepare_workspace(path, num_tls):
+    """
+    Creates the scenario files the simulation code expects, in a scratch directory
+    that becomes the working directory (config.py paths are relative).
+    """
+    os.chdir(path)
+    traci.configure(num_tls=num_tls)
+    from config import SUMO_CONFIG_DIR, NET_FILE, ROUTE_FILE, SUMOCFG_FILE, TYPE_FILE
+    os.makedirs(SUMO_CONFIG_DIR, exist_ok=True)
+    logics = traci.default_logics()
+    with open(NET_FILE, 'w') as f:
+        f.write('<net>\n')
+        for tls_id, logic in logics.items():
+            f.write(f'    <tlLogic id="{tls_id}" type="static" programID="0" offset="0">\n')
+            for phase in logic.phases:
+                f.write(f'        <phase duration="{phase.duration}" state="{phase.state}"/>\n')
+            f.write('    </tlLogic>\n')
+        f.write('</net>\n')
+    for filename in (ROUTE_FILE, SUMOCFG_FILE, TYPE_FILE):
+        with open(filename, 'w') as f:
+            f.write('<routes/>\n')
+
+def traffic_light_info_for(num_genes):
+    """Synthetic traffic light info with `num_genes` green phases, for the GA operator benchmarks."""
+    return {f"J{k}": {'green_phases': [0, 2], 'all_phases': []} for k in range(num_genes // 2)}
+
+def reference_workload():
+    """
+    The bare fake simulation without call latency, as the machine's speed reference: one
+    load and reference_workload.steps simulation steps.
+    """
+    if reference_workload.sim is None:
+        reference_workload.sim = traci.Connection(["sumo"], "reference")
+    reference_workload.sim.load([])
+    for _ in range(reference_workload.steps):
+        reference_workload.sim.simulationStep()
+
+reference_workload.sim = None
+reference_workload.steps = 2000
+
+def latency_of(func):
+    """Returns the TraCI call latency of one func() call, after a first call that warms it up."""
+    func()
+    waited = traci.STATS['latency_seconds']
+    func()
+    return traci.STATS['latency_seconds'] - waited
+
+def benchmark_result(timing, unit, factor=1.0, higher_is_better=True):
+    """
+    A result: `factor` calls per second of the timing (e.g. children bred per call), or
+    its seconds per call times `factor` for a cost such as µs/step.
+    """
+    value = factor / timing.seconds if higher_is_better else timing.seconds * factor
+    return {'value': value, 'unit': unit, 'higher_is_better': higher_is_better, 'factor': factor,
+            'cost': timing.cost, 'fixed': timing.fixed, 'reference': timing.reference}
+
+def bench_ga_operators(results, quick):
+    from genetic_algorithm.ga_core import create_chromosome, selection, crossover, mutate
+
+    for num_genes in ((10, 100) if quick else (10, 100, 1000)):
+        for population_size in ((20,) if quick else (20, 200)):
+            info = traffic_light_info_for(num_genes)
+            population = [create_chromosome(info) for _ in range(population_size)]
+            population_with_fitness = [(chrom, random.random()) for chrom in population]
+
+            def breed():
+                for _ in range(population_size):
+                    mutate(crossover(selection(population_with_fitness), selection(population_with_fitness)))
+
+            results[f"ga_breed[genes={num_genes},pop={population_size}]"] = benchmark_result(
+                measure(breed), 'children/s', factor=population_size)
+            timing = measure(lambda: [create_chromosome(info) for _ in range(population_size)])
+            results[f"ga_create[genes={num_genes},pop={population_size}]"] = benchmark_result(
+                timing, 'chromosomes/s', factor=population_size)
+
+def bench_fitness(results, quick):
+    from genetic_algorithm.ga_utilities import calculate_fitness
+
+    for num_trips in ((1000,) if quick else (1000, 100000)):
+        durations = [60.0 + (i * 7919) % 120 for i in range(num_trips)]
+        waiting_times = [(i * 104729) % 40 / 2 for i in range(num_trips)]
+        timing = measure(lambda: calculate_fitness(durations, waiting_times))
+        results[f"calculate_fitness[trips={num_trips}]"] = benchmark_result(timing, 'calls/s')
+
+def bench_chromosome_storage(results, quick):
+    from genetic_algorithm.ga_utilities import save_chromosome, load_chromosome
+
+    filename = "bench_chromosomes.txt"
+    chromosome = [random.randint(5, 60) for _ in range(1000)]
+
+    # save_chromosome reports every write; keep the benchmark output readable.
+    stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    try:
+        # Same file size in every mode, so quick runs stay comparable with the baseline.
+        for _ in range(1000):
+            save_chromosome(chromosome, filename)
+        save_timing = measure(lambda: save_chromosome(chromosome, filename))
+        load_timing = measure(lambda: load_chromosome(filename))
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    results["save_chromosome[genes=1000]"] = benchmark_result(save_timing, 'calls/s')
+    results["load_chromosome[genes=1000]"] = benchmark_result(load_timing, 'calls/s')
+
+def bench_evaluation(results, quick):
+    from config import SIM_STEPS
+    from sumo_simulation.sumo_runner import get_traffic_light_info, evaluate_fitness, build_sumo_command, worker_directory
+    from sumo_simulation.instrumentation import EvaluationTrace
+    from sumo_simulation.tls_program import TlsProgram
+
+    traffic_light_info = get_traffic_light_info()
+    tls_program = TlsProgram(traffic_light_info)
+    chromosome = [30] * len(tls_program.gene_index)
+    repeat = 5 if quick else 7
+
+    # Cost of the fake simulation alone, subtracted to get the overhead of sumo_runner.
+    traci.start(build_sumo_command(worker_directory(0)), label="bench_raw")
+    conn = traci.getConnection("bench_raw")
+    def raw_steps():
+        conn.load(build_sumo_command(worker_directory(0))[1:])
+        for _ in range(SIM_STEPS):
+            conn.simulationStep()
+    raw = measure(raw_steps, repeat=repeat, fixed=latency_of(raw_steps))
+    conn.close()
+
+    for metric_collection in ('subscription', 'polling'):
+        for traced in (False, True):
+            def evaluate():
+                trace = EvaluationTrace() if traced else None
+                evaluate_fitness(chromosome, traffic_light_info, metric_collection=metric_collection,
+                                 tls_program=tls_program, trace=trace)
+            timing = measure(evaluate, repeat=repeat, fixed=latency_of(evaluate))
+            name = f"evaluate_fitness[{metric_collection}{',traced' if traced else ''}]"
+            results[name] = benchmark_result(timing, 'evaluations/s')
+            overhead = Timing((timing.seconds - raw.seconds) / SIM_STEPS, timing.reference,
+                              (timing.fixed - raw.fixed) / SIM_STEPS, (timing.cost - raw.cost) / SIM_STEPS)
+            results[f"step_overhead[{metric_collection}{',traced' if traced else ''}]"] = benchmark_result(
+                overhead, 'us/step', factor=1e6, higher_is_better=False)
+
+    # The fake libsumo exposes its domains as classes, like the real one; the traced run
+    # checks that the instrumentation still reaches their methods.
+    from sumo_simulation import backends
+    from sumo_simulation.session import get_session
+    traci_backend, backends._backend = backends.get_backend(), backends.LibsumoBackend()
+    try:
+        for traced in (False, True):
+            def evaluate():
+                trace = EvaluationTrace() if traced else None
+                evaluate_fitness(chromosome, traffic_light_info, worker_id=1, tls_program=tls_program, trace=trace)
+            results[f"evaluate_fitness[libsumo{',traced' if traced else ''}]"] = benchmark_result(
+                measure(evaluate, repeat=repeat), 'evaluations/s')
+    finally:
+        get_session(1).close()
+        backends._backend = traci_backend
+
+def bench_generations(results, quick):
+    from sumo_simulation.sumo_runner import get_traffic_light_info
+    from sumo_simulation.parallel_eval import ParallelEvaluator
+    from genetic_algorithm.ga_core import create_chromosome
+    from genetic_algorithm.ga_utilities import fitness_key
+    from genetic_algorithm.optimizers import breed_offspring
+
+    traffic_light_info = get_traffic_light_info()
+    population_size, generations = (6, 2) if quick else (10, 3)
+
+    def run_generations():
+        random.seed(0)
+        population = [create_chromosome(traffic_light_info) for _ in range(population_size)]
+        for _ in range(generations):
+            fitnesses = evaluator.evaluate(population)
+            population_with_fitness = sorted(zip(population, fitnesses), key=lambda x: fitness_key(x[1]))
+            population = ([population_with_fitness[0][0]] +
+                          breed_offspring(population_with_fitness, population_size - 1))
+
+    # The workers run in other processes, where the call latency could not be told apart
+    # from their CPU time; evaluate_fitness already shows the cost of the latency.
+    call_latency = traci.SETTINGS['call_latency']
+    traci.configure(call_latency=0.0)
+    evaluator = ParallelEvaluator(traffic_light_info, num_workers=1, cache=None, instrument=False)
+    try:
+        timing = measure(run_generations, repeat=5)
+    finally:
+        evaluator.close()
+        traci.configure(call_latency=call_latency)
+
+    results[f"generation[pop={population_size}]"] = benchmark_result(timing, 'generations/s', factor=generations)
+    results[f"generation_evaluations[pop={population_size}]"] = benchmark_result(
+        timing, 'evaluations/s', factor=generations * population_size)
+
+BENCHMARKS = [bench_ga_operators, bench_fitness, bench_chromosome_storage, bench_evaluation, bench_generations]
+
+def compare(results, baseline, tolerance):
+    """
+    Prints every result next to its baseline and returns the names of the regressions.
+    The baseline is rescaled to this run: its cost in reference steps is converted to
+    seconds with the reference speed timed along with the result, and the call latency
+    of the result is added unscaled.
+    """
+    regressions = []
+    print(f"\n{'benchmark':<48} {'result':>14} {'baseline':>14} {'change':>8}")
+    for name, result in results.items():
+        reference = baseline.get(name)
+        line = f"{name:<48} {result['value']:>14.2f}"
+        if reference is None:
+            print(f"{line} {'-':>14} {'':>8}  {result['unit']}")
+            continue
+        seconds = reference['cost'] / result['reference'] + result['fixed']
+        expected = reference['factor'] / seconds if reference['higher_is_better'] else seconds * reference['factor']
+        change = (result['value'] - expected) / abs(expected) if expected else 0.0
+        worse = -change if result['higher_is_better'] else change
+        flag = ""
+        if worse > tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{line} {expected:>14.2f} {change:>+8.0%}  {result['unit']}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="smaller sizes")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help=f"write the results to {BASELINE_FILE}, as the baseline of this mode")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed relative slowdown (default: 0.3)")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    parser.add_argument("--call-latency", type=float, default=10.0,
+                        help="microseconds per TraCI round trip of the fake SUMO (default: 10)")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workspace:
+        prepare_workspace(workspace, num_tls=2)
+        traci.configure(call_latency=args.call_latency * 1e-6)
+        random.seed(0)
+        for benchmark in BENCHMARKS:
+            print(f"INFO – Running {benchmark.__name__}...")
+            benchmark(results, args.quick)
+        os.chdir(REPO_DIR)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    mode = 'quick' if args.quick else 'full'
+    baselines = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE) as f:
+            baselines = json.load(f)
+
+    if args.update_baseline:
+        baselines[mode] = results
+        with open(BASELINE_FILE, 'w') as f:
+            json.dump(baselines, f, indent=2)
+        compare(results, {}, args.tolerance)
+        print(f"\nINFO – Baseline of the {mode} mode written to '{BASELINE_FILE}'.")
+        return 0
+
+    if mode not in baselines:
+        print(f"WARNING: No baseline of the {mode} mode found in '{BASELINE_FILE}'.")
+    regressions = compare(results, baselines.get(mode, {}), args.tolerance)
+    if regressions:
+        print(f"\nCRITICAL – {len(regressions)} benchmark(s) regressed by more than {args.tolerance:.0%}.")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+# cli.py
+
+import argparse
+import sys
+
+# Only the standard library is imported here: the optimizer modules are imported after
+# the command line has been turned into config overrides, so --help answers immediately.
+
+def _setting(text):
+    """Parses a --set argument of the form NAME=VALUE."""
+    name, separator, value = text.partition("=")
+    if not separator or not name:
+        raise argparse.ArgumentTypeError(f"expected NAME=VALUE, got '{text}'")
+    return name.strip().upper(), value
+
+def _add_common_arguments(parser):
+    parser.add_argument("--workers", dest="NUM_WORKERS", type=int, help="SUMO worker processes")
+    parser.add_argument("--population-size", dest="POPULATION_SIZE", type=int, help="individuals per population")
+    parser.add_argument("--budget", dest="EVALUATION_BUDGET", type=int, help="simulations of a steady-state run")
+    parser.add_argument("--timeout", dest="EVALUATION_TIMEOUT", type=float,
+                        help="wall-clock seconds after which a steady-state evaluation is stopped")
+    parser.add_argument("--seed", dest="GA_SEED", type=int, help="seed of all random number generators of the run")
+    parser.add_argument("--backend", dest="SIM_BACKEND", choices=["traci", "libsumo"], help="simulation backend")
+    parser.add_argument("--no-cache", dest="FITNESS_CACHE_ENABLED", action="store_const", const=False,
+                        help="do not read or write the fitness cache")
+    parser.add_argument("--no-trace", dest="TRACE_ENABLED", action="store_const", const=False,
+                        help="do not write the evaluation trace")
+    parser.add_argument("--set", dest="settings", type=_setting, action="append", default=[], metavar="NAME=VALUE",
+                        help="override any config.py constant, e.g. --set VEHICLE_COUNT=500 (repeatable)")
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="cli.py",
+        description="Traffic light optimization with SUMO. Settings come from config.py, "
+                    "TLO_<NAME> environment variables and the flags below, in increasing priority."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    optimize = commands.add_parser("optimize", help="run the optimizer once (same as main.py)")
+    optimize.add_argument("--generations", dest="NUM_GENERATIONS", type=int, help="generations to evolve")
+    optimize.add_argument("--mode", dest="GA_MODE", choices=["generational", "steady_state"], help="GA mode")
+    optimize.add_argument("--optimizer", dest="OPTIMIZER", choices=["ga", "de"], help="engine of the generational loop")
+    optimize.add_argument("--islands", dest="ISLAND_COUNT", type=int, help="island populations (1 = off)")
+    optimize.add_argument("--target", dest="TARGET_FITNESS", type=float, help="fitness of the evaluations-to-target report")
+    optimize.add_argument("--no-checkpoint", dest="CHECKPOINT_ENABLED", action="store_const", const=False,
+                          help="neither resume from nor write a checkpoint")
+    optimize.add_argument("--no-plot", dest="PLOT_ENABLED", action="store_const", const=False,
+                          help="do not save the convergence plot (matplotlib is then never imported)")
+    _add_common_arguments(optimize)
+
+    service = commands.add_parser("service", help="re-optimize for every demand window (same as service.py)")
+    service.add_argument("--watch-dir", dest="SERVICE_WATCH_DIR", help="directory watched for demand windows")
+    service.add_argument("--output-dir", dest="SERVICE_OUTPUT_DIR", help="directory of the published plans")
+    service.add_argument("--deadline", dest="SERVICE_DEADLINE", type=float,
+                         help="seconds after a window arrives until its plan is published")
+    _add_common_arguments(service)
+
+    show = commands.add_parser("config", help="print the effective settings and exit")
+    show.add_argument("--set", dest="settings", type=_setting, action="append", default=[], metavar="NAME=VALUE",
+                      help="override any config.py constant (repeatable)")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # Flag values are passed as literals, so that e.g. --watch-dir 2024 stays a string.
+    overrides = {name: repr(value) for name, value in vars(args).items() if name.isupper() and value is not None}
+    overrides.update(args.settings)
+
+    import config
+    try:
+        config.configure(**overrides)
+    except ValueError as e:
+        print(f"CRITICAL – {e}")
+        sys.exit(2)
+
+    if args.command == "config":
+        for name, value in vars(config).items():
+            if name.isupper() and not name.startswith("_") and name != "ENV_PREFIX":
+                print(f"{name} = {value!r}")
+    elif args.command == "optimize":
+        from main import main as run_optimizer
+        run_optimizer()
+    elif args.command == "service":
+        from service import run_service
+        run_service()
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 # config.py
 
+import ast
 import os
 import sys
 import logging
@@ -13,34 +14,161 @@ ROUTE_FILE = os.path.join(SUMO_CONFIG_DIR, "routes7.rou.xml")
 SUMOCFG_FILE = os.path.join(SUMO_CONFIG_DIR, "simulation7.sumocfg")
 TYPE_FILE = os.path.join(SUMO_CONFIG_DIR, "types7.type.xml")
 BEST_CHROMOSOME_FILE = "best_chromosome.txt"
+WORKER_DIR = os.path.join(SUMO_CONFIG_DIR, "workers")
+FITNESS_CACHE_FILE = "fitness_cache.sqlite"
+CHECKPOINT_FILE = "ga_checkpoint.npz"
+TRACE_FILE = "evaluation_trace.jsonl"
+PROFILE_DIR = "profiles"
+OPTIMIZER_REPORT_FILE = "optimizer_runs.jsonl"  # One summary line per run, to compare optimizers
+SCENARIO_CACHE_DIR = os.path.join(SUMO_CONFIG_DIR, "scenarios")  # Generated scenarios, keyed by a hash of their inputs
 
 # === Simulation Parameters ===
 VEHICLE_COUNT = 250
 SIMULATION_DURATION = 1000
 STEP_LENGTH = 0.1
 SIM_STEPS = int(SIMULATION_DURATION / STEP_LENGTH)
+SCENARIO_SEED = 0  # Seed of the random trip generation; change it to get a new scenario
+DEPARTURE_PROFILE = None  # [(start_time, relative_rate), ...] piecewise-constant demand over time (None = uniform)
+ROUTING_CHUNK_SIZE = 50000  # Trips per duarouter run; larger trip sets are routed in chunks and merged
+ROUTING_PROCESSES = 4  # duarouter processes running at the same time
+WARMUP_DURATION = 0  # Seconds simulated once with the baseline programs and reused by every evaluation (0 = off)
+TLS_PROGRAM_MODE = "additional"  # "additional" (compiled <tlLogic> file) or "traci" (per-TLS reprogramming)
+METRIC_COLLECTION = "subscription"  # "subscription" (bulk TraCI subscriptions) or "polling" (per-vehicle calls)
 
 # === Environment Variables and SUMO Binaries ===
-if 'SUMO_HOME' not in os.environ:
-    print("CRITICAL – SUMO_HOME environment variable is not defined. Exiting script.")
-    sys.exit(1)
-
-SUMO_BINARY = os.path.join(os.environ['SUMO_HOME'], 'bin', 'sumo')
-NETCONVERT = os.path.join(os.environ['SUMO_HOME'], 'bin', 'netconvert')
-DUAROUTER = os.path.join(os.environ['SUMO_HOME'], 'bin', 'duarouter')
+SUMO_HOME = os.environ.get('SUMO_HOME', '')  # Checked by prepare_environment(), not at import
+SUMO_BINARY = os.path.join(SUMO_HOME, 'bin', 'sumo')
+NETCONVERT = os.path.join(SUMO_HOME, 'bin', 'netconvert')
+DUAROUTER = os.path.join(SUMO_HOME, 'bin', 'duarouter')
+SIM_BACKEND = "traci"  # "traci" (SUMO process over a socket) or "libsumo" (in-process, one simulation per process)
+SESSION_MAX_EVALUATIONS = 50  # Evaluations served by one SUMO instance before it is restarted (1 = restart every time)
 
 # === Genetic Algorithm Parameters ===
 POPULATION_SIZE = 20
+NUM_WORKERS = 1  # Number of SUMO worker processes used to evaluate a generation
 NUM_GENERATIONS = 5
 MUTATION_RATE = 0.2
 TOURNAMENT_SIZE = 2
 MIN_PHASE_DURATION = 5
 MAX_PHASE_DURATION = 60
+GA_ENGINE = "python"  # "python" (ga_core, list based) or "numpy" (ga_vectorized, whole-population arrays)
+GA_SEED = None  # Seed of Python's random, the numpy engine, DE and the islands (None = non-deterministic)
+CHECKPOINT_ENABLED = True  # Save the GA state after every generation and resume interrupted runs
+GA_MODE = "generational"  # "generational" or "steady_state" (asynchronous, one child per finished evaluation)
+EVALUATION_BUDGET = None  # Simulations of a steady-state run (None = POPULATION_SIZE * NUM_GENERATIONS)
+EVALUATION_TIMEOUT = None  # Wall-clock seconds after which a steady-state evaluation is stopped (None = no limit)
+
+# === Optimizer ===
+OPTIMIZER = "ga"  # Engine of the generational loop: "ga" (genetic algorithm) or "de" (differential evolution)
+DE_WEIGHT = 0.5  # Differential weight F of differential evolution
+DE_CROSSOVER_RATE = 0.9  # Probability that a trial gene comes from the mutant vector
+TARGET_FITNESS = None  # Fitness whose evaluations-to-target (simulations needed) is reported per optimizer
+
+# === Service Mode (service.py, rolling-horizon re-optimization) ===
+SERVICE_WATCH_DIR = "demand_windows"  # Trip (.trips.xml) or route (.rou.xml) files dropped here start a new window
+SERVICE_OUTPUT_DIR = "published_plans"  # Best plan of every window, as a <tlLogic> additional file
+SERVICE_DEADLINE = 300  # Wall-clock seconds after a window arrives until its plan is published
+SERVICE_POLL_INTERVAL = 5  # Seconds between two scans of SERVICE_WATCH_DIR
+
+# === Island Model ===
+ISLAND_COUNT = 1  # Independent populations, each evolved in its own process with NUM_WORKERS workers (1 = off)
+MIGRATION_INTERVAL = 5  # Generations between two migrations
+MIGRATION_SIZE = 2  # Best individuals an island sends to each of its neighbours
+MIGRATION_TOPOLOGY = "ring"  # "ring" (island i sends to island i+1) or "all_to_all"
+
+# === Racing (early termination of hopeless simulations) ===
+RACING_ENABLED = False
+RACING_CUTOFF_QUANTILE = 0.5  # Cutoff = this quantile of the previous generation's fitness values
+RACING_CHECK_INTERVAL = 100  # Simulation steps between two lower-bound checks
+
+# === Multi-Fidelity Evaluation ===
+MULTI_FIDELITY_ENABLED = False
+# Cheap tier used to screen the whole population; only the best FULL_FIDELITY_TOP_K
+# individuals are then re-evaluated with STEP_LENGTH over SIMULATION_DURATION.
+SCREENING_TIER = {"name": "screening", "step_length": 1.0, "duration": 500, "mesosim": False}
+FULL_FIDELITY_TOP_K = 5  # At least 1
+
+# === Surrogate Pre-Screening ===
+SURROGATE_ENABLED = False
+SURROGATE_KEEP_FRACTION = 0.5  # Fraction of the bred candidates that is actually simulated
+SURROGATE_MIN_SAMPLES = 20  # Exact evaluations needed before the surrogate is used
+SURROGATE_MAX_SAMPLES = 2000  # Most recent evaluations kept as training data
+SURROGATE_RIDGE = 1.0  # Regularization strength of the ridge regression
+
+# === Instrumentation ===
+PLOT_ENABLED = True  # Save the convergence plot at the end of a run (imports matplotlib)
+TRACE_ENABLED = True  # Per-evaluation phase timers and TraCI call counters, appended to TRACE_FILE
+PROFILER = None  # None, "pyinstrument" (sampling) or "cprofile"; one report per process in PROFILE_DIR
+
+# === Fitness Cache ===
+FITNESS_CACHE_ENABLED = True
+FITNESS_CACHE_MEMORY_SIZE = 10000  # Entries kept in memory (LRU)
+FITNESS_CACHE_DISK_SIZE = 1000000  # Entries kept in FITNESS_CACHE_FILE across runs
+
+# === Overrides ===
+# Every constant above can be set with an environment variable TLO_<NAME>, e.g.
+# TLO_POPULATION_SIZE=50 or TLO_GA_MODE=steady_state. Values are parsed as Python
+# literals (numbers, None, True, lists, dicts) and otherwise taken as plain strings.
+# Worker processes inherit the environment, so they see the same settings.
+ENV_PREFIX = "TLO_"
+_CONFIG_DIR_FILES = ("OSM_FILE", "NET_FILE", "TRIP_FILE", "ROUTE_FILE", "SUMOCFG_FILE", "TYPE_FILE",
+                     "WORKER_DIR", "SCENARIO_CACHE_DIR")
+_overridden = set()
+
+def _is_setting(name):
+    return name.isupper() and not name.startswith('_') and name in globals()
+
+def _parse_value(value):
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return value
+
+def _apply_overrides(environ):
+    """Sets the constants named by TLO_<NAME> variables and recomputes the values derived from them."""
+    settings = globals()
+    for key, value in environ.items():
+        name = key[len(ENV_PREFIX):]
+        if key.startswith(ENV_PREFIX) and _is_setting(name):
+            settings[name] = _parse_value(value)
+            _overridden.add(name)
+
+    derived = {
+        'SIM_STEPS': int(SIMULATION_DURATION / STEP_LENGTH),
+        'SUMO_BINARY': os.path.join(SUMO_HOME, 'bin', 'sumo'),
+        'NETCONVERT': os.path.join(SUMO_HOME, 'bin', 'netconvert'),
+        'DUAROUTER': os.path.join(SUMO_HOME, 'bin', 'duarouter'),
+    }
+    for name in _CONFIG_DIR_FILES:
+        derived[name] = os.path.join(SUMO_CONFIG_DIR, os.path.basename(settings[name]))
+    settings.update({name: value for name, value in derived.items() if name not in _overridden})
+
+def configure(**settings):
+    """
+    Overrides constants of this module, e.g. configure(POPULATION_SIZE=50), through their
+    TLO_<NAME> environment variables so that worker processes inherit them. Must be called
+    before the modules that import the constants are imported.
+    """
+    for name, value in settings.items():
+        if not _is_setting(name):
+            raise ValueError(f"Unknown setting '{name}'.")
+        os.environ[ENV_PREFIX + name] = value if isinstance(value, str) else repr(value)
+    _apply_overrides(os.environ)
+
+def prepare_environment():
+    """
+    Checks SUMO_HOME, silences the library loggers and creates SUMO_CONFIG_DIR. Called by
+    the entry points (main.py, service.py), so importing this module has no side effects.
+    """
+    if not SUMO_HOME:
+        print("CRITICAL – SUMO_HOME environment variable is not defined. Exiting script.")
+        sys.exit(1)
+
+    log = logging.getLogger()
+    log.setLevel(logging.CRITICAL)
+    if log.hasHandlers():
+        log.handlers.clear()
 
-# --- Log Configuration ---
-log = logging.getLogger()
-log.setLevel(logging.CRITICAL)
-if log.hasHandlers():
-    log.handlers.clear()
+    os.makedirs(SUMO_CONFIG_DIR, exist_ok=True)
 
-os.makedirs(SUMO_CONFIG_DIR, exist_ok=True)
+_apply_overrides(os.environ)
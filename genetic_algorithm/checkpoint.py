@@ -0,0 +1,106 @@
+# genetic_algorithm/checkpoint.py
+
+import json
+import os
+import random
+import numpy as np
+from config import CHECKPOINT_FILE
+from .ga_utilities import Fitness, FITNESS_TIERS, fitness_tier
+
+def save_checkpoint(state, filename=CHECKPOINT_FILE, engine=None):
+    """
+    Atomically writes the GA state of a completed generation to a compressed .npz file.
+
+    `state` holds 'generation', 'population', 'fitnesses', 'next_population',
+    'best_fitness_history', 'average_fitness_history', 'best_overall_chromosome',
+    'best_overall_fitness' and 'racing_cutoff', and optionally the 'optimizer' name, its
+    JSON-serializable 'optimizer_state', the number of 'simulations' so far, the
+    'evaluations_to_target' and the 'scenario' fingerprint the fitness values belong to.
+    The random generators (Python's and, if given, the numpy engine's) are saved along
+    with it.
+    """
+    fitnesses = state['fitnesses']
+    rng_state = {'python': random.getstate()}
+    if engine is not None:
+        rng_state['numpy'] = engine.rng.bit_generator.state
+    racing_cutoff = state['racing_cutoff']
+    evaluations_to_target = state.get('evaluations_to_target')
+
+    arrays = {
+        'generation': np.array(state['generation']),
+        'population': np.array(state['population'], dtype=np.int64),
+        'fitness': np.array([float(f) for f in fitnesses], dtype=np.float64),
+        'fitness_censored': np.array([getattr(f, 'censored', False) for f in fitnesses], dtype=bool),
+        'fitness_tier': np.array([FITNESS_TIERS.index(fitness_tier(f)) for f in fitnesses], dtype=np.uint8),
+        'next_population': np.array(state['next_population'], dtype=np.int64),
+        'best_fitness_history': np.array([float(f) for f in state['best_fitness_history']]),
+        'average_fitness_history': np.array(state['average_fitness_history'], dtype=np.float64),
+        'best_overall_chromosome': np.array(state['best_overall_chromosome'], dtype=np.int64),
+        'best_overall_fitness': np.array(float(state['best_overall_fitness'])),
+        'racing_cutoff': np.array(np.nan if racing_cutoff is None else racing_cutoff),
+        'rng_state': np.array(json.dumps(rng_state)),
+        'optimizer': np.array(state.get('optimizer', 'ga')),
+        'optimizer_state': np.array(json.dumps(state.get('optimizer_state', {}))),
+        'simulations': np.array(state.get('simulations', 0)),
+        'evaluations_to_target': np.array(-1 if evaluations_to_target is None else evaluations_to_target),
+        'scenario': np.array(state.get('scenario', '')),
+    }
+
+    tmp_filename = filename + ".tmp"
+    try:
+        with open(tmp_filename, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp_filename, filename)
+    except IOError as e:
+        print(f"WARNING: Could not write checkpoint '{filename}'. Error: {e}")
+
+def load_checkpoint(filename=CHECKPOINT_FILE):
+    """
+    Loads the GA state written by save_checkpoint. Returns None if there is no readable
+    checkpoint. The random generators are left alone until restore_random_state is
+    called, so a checkpoint that turns out not to match the run does not affect it.
+    """
+    if not os.path.exists(filename):
+        return None
+
+    try:
+        with np.load(filename) as data:
+            arrays = {key: data[key] for key in data.files}
+    except (IOError, ValueError) as e:
+        print(f"WARNING: Could not read checkpoint '{filename}'. Error: {e}")
+        return None
+
+    fitnesses = [
+        Fitness(value, censored=bool(censored), tier=FITNESS_TIERS[tier])
+        for value, censored, tier in zip(arrays['fitness'], arrays['fitness_censored'], arrays['fitness_tier'])
+    ]
+    racing_cutoff = float(arrays['racing_cutoff'])
+    # Checkpoints written before the optimizer interface only contain the GA state.
+    evaluations_to_target = int(arrays.get('evaluations_to_target', -1))
+
+    print(f"INFO – Checkpoint of generation {int(arrays['generation']) + 1} loaded from '{filename}'.")
+    return {
+        'generation': int(arrays['generation']),
+        'population': arrays['population'].tolist(),
+        'fitnesses': fitnesses,
+        'next_population': arrays['next_population'].tolist(),
+        'best_fitness_history': arrays['best_fitness_history'].tolist(),
+        'average_fitness_history': arrays['average_fitness_history'].tolist(),
+        'best_overall_chromosome': arrays['best_overall_chromosome'].tolist(),
+        'best_overall_fitness': float(arrays['best_overall_fitness']),
+        'racing_cutoff': None if np.isnan(racing_cutoff) else racing_cutoff,
+        'optimizer': str(arrays.get('optimizer', 'ga')),
+        'optimizer_state': json.loads(str(arrays.get('optimizer_state', '{}'))),
+        'simulations': int(arrays.get('simulations', 0)),
+        'evaluations_to_target': None if evaluations_to_target < 0 else evaluations_to_target,
+        'scenario': str(arrays.get('scenario', '')),
+        'rng_state': json.loads(str(arrays['rng_state'])),
+    }
+
+def restore_random_state(checkpoint, engine=None):
+    """Restores Python's random generator and, if given, the numpy engine's to their state in `checkpoint`."""
+    rng_state = checkpoint['rng_state']
+    version, internal_state, gauss_next = rng_state['python']
+    random.setstate((version, tuple(internal_state), gauss_next))
+    if engine is not None and 'numpy' in rng_state:
+        engine.rng.bit_generator.state = rng_state['numpy']
@@ -1,9 +1,17 @@
 # genetic_algorithm/ga_core.py
 
+import os
 import random
-from ..config import (
+import sys
+
+if __package__ in (None, ""):
+    # Run as a script: make config and the sibling packages importable from the repository root.
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import (
     MIN_PHASE_DURATION, MAX_PHASE_DURATION, MUTATION_RATE, TOURNAMENT_SIZE
 )
+from genetic_algorithm.ga_utilities import fitness_key
 
 def create_chromosome(traffic_light_info):
     """
@@ -21,7 +29,7 @@ def selection(population_with_fitness):
     Performs tournament selection to choose a parent chromosome.
     """
     tournament = random.sample(population_with_fitness, min(TOURNAMENT_SIZE, len(population_with_fitness)))
-    tournament.sort(key=lambda x: x[1])
+    tournament.sort(key=lambda x: fitness_key(x[1]))
     return tournament[0][0]
 
 def crossover(parent1, parent2):
@@ -1,7 +1,13 @@
 # genetic_algorithm/ga_utilities.py
 
 import os
-from ..config import SIMULATION_DURATION, VEHICLE_COUNT, BEST_CHROMOSOME_FILE
+import sys
+
+if __package__ in (None, ""):
+    # Run as a script: make config and the sibling packages importable from the repository root.
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import SIMULATION_DURATION, VEHICLE_COUNT, BEST_CHROMOSOME_FILE
 
 def save_chromosome(chromosome, filename=BEST_CHROMOSOME_FILE):
     """
@@ -15,6 +21,23 @@ def save_chromosome(chromosome, filename=BEST_CHROMOSOME_FILE):
     except IOError as e:
         print(f"WARNING: Could not append chromosome to '{filename}'. Error: {e}")
 
+def _read_last_line(f, block_size=4096):
+    """
+    Returns the last non-empty line of a binary file, reading blocks backwards from its end.
+    """
+    f.seek(0, os.SEEK_END)
+    position = f.tell()
+    data = b""
+    while position > 0:
+        read_size = min(block_size, position)
+        position -= read_size
+        f.seek(position)
+        data = f.read(read_size) + data
+        stripped = data.strip()
+        if b"\n" in stripped or (position == 0 and stripped):
+            return stripped.rsplit(b"\n", 1)[-1]
+    return b""
+
 def load_chromosome(filename=BEST_CHROMOSOME_FILE):
     """
     Loads the last saved chromosome from a text file.
@@ -24,15 +47,8 @@ def load_chromosome(filename=BEST_CHROMOSOME_FILE):
         return None
 
     try:
-        with open(filename, 'r') as f:
-            lines = f.readlines()
-
-        last_line = ""
-        for line in reversed(lines):
-            stripped_line = line.strip()
-            if stripped_line:
-                last_line = stripped_line
-                break
+        with open(filename, 'rb') as f:
+            last_line = _read_last_line(f).decode().strip()
 
         if not last_line:
             print(f"WARNING: File '{filename}' is empty or contains only empty lines.")
@@ -59,23 +75,69 @@ def load_chromosome(filename=BEST_CHROMOSOME_FILE):
         print(f"WARNING: Could not read file '{filename}'. Error: {e}")
         return None
 
-def calculate_fitness(durations, waiting_times):
+# Weights of the mean trip duration and mean waiting time in the fitness.
+W_DURATION, W_WAITING = 1.0, 0.5
+
+# Evaluation tiers, from most to least trusted. Plain floats are full-fidelity values.
+FITNESS_TIERS = ('full', 'screening')
+
+class Fitness(float):
+    """
+    A fitness value that carries evaluation details.
+    A censored fitness is only a lower bound: the simulation was stopped early
+    (skipping `steps_saved` steps) once it could no longer beat the racing cutoff.
+    `tier` names the fidelity of the simulation that produced the value.
+    """
+
+    def __new__(cls, value, censored=False, steps_saved=0, tier='full'):
+        fitness = super().__new__(cls, value)
+        fitness.censored = censored
+        fitness.steps_saved = steps_saved
+        fitness.tier = tier
+        return fitness
+
+def fitness_tier(fitness):
+    return getattr(fitness, 'tier', 'full')
+
+def fitness_key(fitness):
+    """
+    Sort key for fitness values. Values are only compared within a tier: full-fidelity
+    values rank before screening ones, and censored values rank after all exact ones
+    since they are known to be worse than the cutoff; otherwise lower is better.
+    """
+    return (FITNESS_TIERS.index(fitness_tier(fitness)), getattr(fitness, 'censored', False), fitness)
+
+def calculate_fitness(durations, waiting_times, simulation_duration=SIMULATION_DURATION, vehicle_count=VEHICLE_COUNT):
     """
     Calculates the fitness of a solution. A lower fitness value is better.
+    Uncompleted trips, out of the `vehicle_count` of the scenario, are penalized with the
+    simulated horizon, `simulation_duration`.
     """
     num_arrived = len(durations)
-    num_uncompleted = VEHICLE_COUNT - num_arrived
+    num_uncompleted = vehicle_count - num_arrived
 
-    uncompleted_duration_contribution = num_uncompleted * SIMULATION_DURATION
-    uncompleted_waiting_contribution = num_uncompleted * SIMULATION_DURATION
+    uncompleted_duration_contribution = num_uncompleted * simulation_duration
+    uncompleted_waiting_contribution = num_uncompleted * simulation_duration
 
     total_duration = sum(durations) + uncompleted_duration_contribution
     total_waiting = sum(waiting_times) + uncompleted_waiting_contribution
 
-    mean_duration = total_duration / VEHICLE_COUNT if VEHICLE_COUNT > 0 else (SIMULATION_DURATION * 2)
-    mean_waiting = total_waiting / VEHICLE_COUNT if VEHICLE_COUNT > 0 else (SIMULATION_DURATION * 2)
+    mean_duration = total_duration / vehicle_count if vehicle_count > 0 else (simulation_duration * 2)
+    mean_waiting = total_waiting / vehicle_count if vehicle_count > 0 else (simulation_duration * 2)
 
-    w1_duration, w2_waiting = 1.0, 0.5
-    fitness = (w1_duration * mean_duration) + (w2_waiting * mean_waiting)
+    fitness = (W_DURATION * mean_duration) + (W_WAITING * mean_waiting)
 
     return fitness
+
+def fitness_lower_bound(durations, waiting_times, elapsed_times, vehicle_count=VEHICLE_COUNT):
+    """
+    Lower bound on the final fitness of a running simulation, given the completed trips
+    and the time already spent by the vehicles still on the road. Every such vehicle will
+    count at least its elapsed time as duration, whether it arrives or not; vehicles not
+    yet departed and future waiting times count at least zero.
+    """
+    if vehicle_count <= 0:
+        return 0.0
+    total_duration = sum(durations) + sum(elapsed_times)
+    total_waiting = sum(waiting_times)
+    return (W_DURATION * total_duration + W_WAITING * total_waiting) / vehicle_count
@@ -0,0 +1,69 @@
+# genetic_algorithm/ga_vectorized.py
+
+import numpy as np
+from config import (
+    MIN_PHASE_DURATION, MAX_PHASE_DURATION, MUTATION_RATE, TOURNAMENT_SIZE, GA_SEED
+)
+from .ga_utilities import fitness_key
+
+class PopulationEngine:
+    """
+    NumPy implementation of the GA operators of ga_core, working on a whole population
+    stored as a 2D integer array (one row per chromosome) in a single pass.
+    The semantics match ga_core: tournament selection without replacement inside a
+    tournament, two-point crossover and per-gene uniform mutation within
+    [MIN_PHASE_DURATION, MAX_PHASE_DURATION].
+    """
+
+    def __init__(self, seed=GA_SEED):
+        self.rng = np.random.default_rng(seed)
+
+    def create_population(self, size, num_genes):
+        """Creates `size` random chromosomes of `num_genes` genes."""
+        return self.rng.integers(MIN_PHASE_DURATION, MAX_PHASE_DURATION + 1, size=(size, num_genes))
+
+    @staticmethod
+    def ranks(fitnesses):
+        """Returns the rank of every fitness value (0 = best), using ga_utilities.fitness_key."""
+        order = sorted(range(len(fitnesses)), key=lambda i: fitness_key(fitnesses[i]))
+        ranks = np.empty(len(fitnesses), dtype=np.int64)
+        ranks[order] = np.arange(len(fitnesses))
+        return ranks
+
+    def selection(self, ranks, num_parents):
+        """Runs `num_parents` tournaments at once and returns the indices of the winners."""
+        population_size = len(ranks)
+        tournament_size = min(TOURNAMENT_SIZE, population_size)
+        keys = self.rng.random((num_parents, population_size))
+        contestants = np.argpartition(keys, tournament_size - 1, axis=1)[:, :tournament_size]
+        winners = np.argmin(ranks[contestants], axis=1)
+        return contestants[np.arange(num_parents), winners]
+
+    def crossover(self, parents1, parents2):
+        """Two-point crossover of every row of `parents1` with the same row of `parents2`."""
+        num_children, num_genes = parents1.shape
+        if num_genes < 3:
+            if num_genes < 2:
+                return parents1.copy()
+            point1 = np.ones(num_children, dtype=np.int64)
+            point2 = np.full(num_children, num_genes)
+        else:
+            point1 = self.rng.integers(1, num_genes - 1, size=num_children)
+            point2 = self.rng.integers(point1 + 1, num_genes)
+        gene_positions = np.arange(num_genes)
+        from_parent2 = (gene_positions >= point1[:, None]) & (gene_positions < point2[:, None])
+        return np.where(from_parent2, parents2, parents1)
+
+    def mutate(self, chromosomes):
+        """Replaces each gene with a new random duration with probability MUTATION_RATE."""
+        mutated = self.rng.random(chromosomes.shape) < MUTATION_RATE
+        new_genes = self.rng.integers(MIN_PHASE_DURATION, MAX_PHASE_DURATION + 1, size=chromosomes.shape)
+        return np.where(mutated, new_genes, chromosomes)
+
+    def breed(self, population, fitnesses, num_children):
+        """Selects parents, crosses them over and mutates the offspring matrix in one pass."""
+        population = np.asarray(population)
+        ranks = self.ranks(fitnesses)
+        parents1 = population[self.selection(ranks, num_children)]
+        parents2 = population[self.selection(ranks, num_children)]
+        return self.mutate(self.crossover(parents1, parents2))
@@ -0,0 +1,153 @@
+# genetic_algorithm/islands.py
+
+import multiprocessing
+import queue
+import random
+import sys
+import traceback
+from config import (
+    POPULATION_SIZE, NUM_GENERATIONS, NUM_WORKERS, GA_SEED, GA_ENGINE, FITNESS_CACHE_ENABLED, RACING_ENABLED,
+    RACING_CUTOFF_QUANTILE, MIGRATION_INTERVAL, MIGRATION_SIZE, MIGRATION_TOPOLOGY, SURROGATE_ENABLED
+)
+from sumo_simulation.parallel_eval import ParallelEvaluator
+from sumo_simulation.sumo_runner import run_directory
+from sumo_simulation.fitness_cache import FitnessCache, scenario_fingerprint
+from sumo_simulation.instrumentation import start_profiler
+from .ga_core import create_chromosome
+from .ga_vectorized import PopulationEngine
+from .ga_utilities import fitness_key, fitness_tier
+from .optimizers import GeneticOptimizer
+from .surrogate import SurrogateModel
+
+def migration_targets(island, num_islands, topology=MIGRATION_TOPOLOGY):
+    """Returns the islands that `island` sends its emigrants to."""
+    if topology == 'ring':
+        return [(island + 1) % num_islands] if num_islands > 1 else []
+    if topology == 'all_to_all':
+        return [i for i in range(num_islands) if i != island]
+    raise ValueError(f"Unknown migration topology '{topology}'.")
+
+def run_islands(traffic_light_info, populations, warmup=None, generations=NUM_GENERATIONS, on_generation=None):
+    """
+    Evolves one population per island, each in its own process with its own
+    ParallelEvaluator (NUM_WORKERS workers) and GeneticOptimizer, which breeds with the
+    GA_ENGINE operators and, with SURROGATE_ENABLED, the island's own surrogate.
+    `populations` holds the initial chromosomes of every island (possibly none); each
+    island fills its population up to POPULATION_SIZE with random chromosomes, drawn
+    after seeding its random generators with GA_SEED + island. Every MIGRATION_INTERVAL
+    generations, each island sends copies of its MIGRATION_SIZE best individuals to its
+    MIGRATION_TOPOLOGY neighbours over multiprocessing queues, where they replace the
+    worst individuals. Islands wait for their immigrants, so runs with a GA_SEED are
+    reproducible.
+
+    `on_generation(island, generation, best, average, records)` is called in this process
+    for every finished island generation, with its trace records.
+    Returns the best exact fitness and chromosome and the (best, average) histories per island.
+    """
+    num_islands = len(populations)
+    for island in range(num_islands):
+        migration_targets(island, num_islands)  # Fails early on an unknown topology.
+    run_directory()  # Fixes the run ID before the islands inherit the environment.
+    results = multiprocessing.Queue()
+    inboxes = [multiprocessing.Queue() for _ in range(num_islands)]
+    processes = [
+        multiprocessing.Process(
+            target=_run_island, name=f"island_{island}",
+            args=(island, num_islands, traffic_light_info, warmup, populations[island], inboxes, results, generations)
+        )
+        for island in range(num_islands)
+    ]
+    for process in processes:
+        process.start()
+
+    histories = [([], []) for _ in range(num_islands)]
+    best_fitness, best_chromosome = float('inf'), []
+    finished = 0
+    try:
+        while finished < num_islands:
+            try:
+                message = results.get(timeout=1.0)
+            except queue.Empty:
+                if any(process.exitcode not in (None, 0) for process in processes):
+                    print("CRITICAL – An island process died unexpectedly.")
+                    sys.exit(1)
+                continue
+
+            kind, island = message[0], message[1]
+            if kind == 'generation':
+                _, _, generation, best, average, chromosome, records = message
+                histories[island][0].append(best)
+                histories[island][1].append(average)
+                is_exact = fitness_tier(best) == 'full' and not getattr(best, 'censored', False)
+                if is_exact and best < best_fitness:
+                    best_fitness, best_chromosome = best, chromosome
+                if on_generation is not None:
+                    on_generation(island, generation, best, average, records)
+            elif kind == 'error':
+                print(f"CRITICAL – Island {island + 1} failed:\n{message[2]}")
+                sys.exit(1)
+            else:
+                finished += 1
+    finally:
+        for process in processes:
+            if finished < num_islands and process.is_alive():
+                process.terminate()
+            process.join()
+
+    return {'best_fitness': best_fitness, 'best_chromosome': best_chromosome, 'histories': histories}
+
+def _run_island(island, num_islands, traffic_light_info, warmup, population, inboxes, results, generations):
+    try:
+        _evolve_island(island, num_islands, traffic_light_info, warmup, population, inboxes, results, generations)
+    except Exception:
+        results.put(('error', island, traceback.format_exc()))
+        return
+    results.put(('done', island))
+
+def _evolve_island(island, num_islands, traffic_light_info, warmup, population, inboxes, results, generations):
+    # Forked islands would otherwise all draw the same random numbers.
+    seed = None if GA_SEED is None else GA_SEED + island
+    random.seed(seed)
+    population = list(population)
+    while len(population) < POPULATION_SIZE:
+        population.append(create_chromosome(traffic_light_info))
+    engine = PopulationEngine(seed) if GA_ENGINE == 'numpy' else None
+    optimizer = GeneticOptimizer(population, engine, SurrogateModel() if SURROGATE_ENABLED else None)
+    start_profiler(f"island_{island}")
+    sources = [i for i in range(num_islands) if island in migration_targets(i, num_islands)]
+    cache = FitnessCache(scenario_fingerprint()) if FITNESS_CACHE_ENABLED else None
+    # Worker IDs (SUMO ports and directories) must not overlap between islands and the main process.
+    evaluator = ParallelEvaluator(traffic_light_info, NUM_WORKERS, cache, warmup,
+                                  first_worker_id=(island + 1) * (NUM_WORKERS + 1))
+    racing_cutoff = None
+
+    try:
+        for gen in range(generations):
+            population = optimizer.ask()
+            fitnesses = evaluator.evaluate(population, racing_cutoff)
+            population_with_fitness = sorted(zip(population, fitnesses), key=lambda x: fitness_key(x[1]))
+            current_fitnesses = [f for _, f in population_with_fitness]
+            average = sum(current_fitnesses) / len(current_fitnesses)
+            best_chromosome, best = population_with_fitness[0]
+            results.put(('generation', island, gen, best, average, best_chromosome, evaluator.pop_trace_records()))
+
+            if RACING_ENABLED:
+                cutoff_index = int(RACING_CUTOFF_QUANTILE * (len(current_fitnesses) - 1))
+                racing_cutoff = float(current_fitnesses[cutoff_index])
+
+            if sources and (gen + 1) % MIGRATION_INTERVAL == 0 and gen + 1 < generations:
+                emigrants = population_with_fitness[:MIGRATION_SIZE]
+                for target in migration_targets(island, num_islands):
+                    inboxes[target].put(emigrants)
+                immigrants = [individual for _ in sources for individual in inboxes[island].get()]
+                # The island's best individual is never replaced.
+                immigrants = immigrants[:len(population_with_fitness) - 1]
+                population_with_fitness = sorted(
+                    population_with_fitness[:len(population_with_fitness) - len(immigrants)] + immigrants,
+                    key=lambda x: fitness_key(x[1])
+                )
+
+            population, fitnesses = zip(*population_with_fitness)
+            optimizer.tell(list(population), list(fitnesses))
+    finally:
+        evaluator.close()
@@ -0,0 +1,223 @@
+# genetic_algorithm/optimizers.py
+
+import abc
+import json
+import math
+import os
+import statistics
+import time
+import numpy as np
+from config import (
+    MIN_PHASE_DURATION, MAX_PHASE_DURATION, SURROGATE_KEEP_FRACTION, GA_SEED,
+    DE_WEIGHT, DE_CROSSOVER_RATE, OPTIMIZER_REPORT_FILE
+)
+from .ga_core import selection, crossover, mutate
+from .ga_utilities import Fitness, fitness_key, fitness_tier
+
+def breed_offspring(population_with_fitness, num_children, engine=None):
+    """
+    Creates `num_children` children of the evaluated population, with the numpy engine
+    if given and the ga_core operators otherwise.
+    """
+    if engine is not None:
+        return engine.breed([c for c, _ in population_with_fitness],
+                            [f for _, f in population_with_fitness], num_children).tolist()
+    offspring = []
+    while len(offspring) < num_children:
+        parent1 = selection(population_with_fitness)
+        parent2 = selection(population_with_fitness)
+        child = crossover(parent1, parent2)
+        mutated_child = mutate(child)
+        offspring.append(mutated_child)
+    return offspring
+
+class Optimizer(abc.ABC):
+    """
+    Ask/tell interface of the optimization engines. ask() returns the batch of chromosomes
+    to evaluate next (the same batch until tell() is called); tell() reports their fitness
+    values, in order, and prepares the next batch.
+    """
+
+    name = None
+
+    def __init__(self, population):
+        self.population = population
+
+    def ask(self):
+        return self.population
+
+    @abc.abstractmethod
+    def tell(self, population, fitnesses):
+        """Reports the fitness values of the batch from ask(), in order, and prepares the next batch."""
+
+    def racing_cutoffs(self, racing_cutoff):
+        """
+        Returns the racing cutoff of the current batch (see ParallelEvaluator.evaluate), given
+        the population-wide quantile cutoff: a simulation can stop once it cannot beat it.
+        """
+        return racing_cutoff
+
+    def state(self):
+        """Returns the engine state besides the next batch, as JSON-serializable data for checkpoints."""
+        return {}
+
+    def restore(self, checkpoint):
+        """Continues from a checkpoint loaded by load_checkpoint; the next batch is already set."""
+
+class GeneticOptimizer(Optimizer):
+    """
+    The generational GA: the best individual survives and the rest of the next generation
+    is bred with the ga_core operators (or the numpy engine). With a SurrogateModel, extra
+    children are bred and only the most promising ones are kept.
+    """
+
+    name = 'ga'
+
+    def __init__(self, population, engine=None, surrogate=None):
+        super().__init__(population)
+        self.engine = engine
+        self.surrogate = surrogate
+
+    def tell(self, population, fitnesses):
+        population_with_fitness = sorted(zip(population, fitnesses), key=lambda x: fitness_key(x[1]))
+        num_children = len(population) - 1
+        surrogate = self.surrogate
+        if surrogate is not None:
+            accuracy = surrogate.accuracy(population, fitnesses)
+            if accuracy is not None:
+                mae, rank_correlation, compared = accuracy
+                print(f"Surrogate accuracy: MAE {mae:.2f}, rank correlation {rank_correlation:.2f} ({compared} individuals)")
+            surrogate.add(population, fitnesses)
+
+        new_population = [population_with_fitness[0][0]]
+        if surrogate is not None and surrogate.is_ready():
+            # Breed extra candidates and only keep the most promising ones for simulation.
+            num_candidates = math.ceil(num_children / SURROGATE_KEEP_FRACTION)
+            candidates = breed_offspring(population_with_fitness, num_candidates, self.engine)
+            new_population.extend(surrogate.select(candidates, num_children))
+            print(f"Surrogate: {num_candidates} candidates screened, {num_candidates - num_children} simulations saved")
+        else:
+            new_population.extend(breed_offspring(population_with_fitness, num_children, self.engine))
+        self.population = new_population
+
+    def restore(self, checkpoint):
+        if self.surrogate is not None:
+            self.surrogate.add(checkpoint['population'], checkpoint['fitnesses'])
+
+def _fitness_to_json(fitness):
+    return [float(fitness), bool(getattr(fitness, 'censored', False)), fitness_tier(fitness)]
+
+def _fitness_from_json(value):
+    fitness, censored, tier = value
+    return Fitness(fitness, censored=censored, tier=tier)
+
+class DifferentialEvolution(Optimizer):
+    """
+    DE/current-to-best/1/bin over the integer phase durations. Every slot of the population
+    produces one trial vector, which replaces the slot's parent if it is at least as good,
+    so the parents never get worse. Trials are rounded and clipped to
+    [MIN_PHASE_DURATION, MAX_PHASE_DURATION]. The first batch is the initial population.
+    With racing, each trial is raced against its own parent's fitness, the only value it
+    has to beat.
+    """
+
+    name = 'de'
+
+    def __init__(self, population, weight=DE_WEIGHT, crossover_rate=DE_CROSSOVER_RATE, seed=GA_SEED):
+        if len(population) < 3:
+            raise ValueError("Differential evolution needs a population of at least 3 individuals.")
+        super().__init__(population)
+        self.weight = weight
+        self.crossover_rate = crossover_rate
+        self.rng = np.random.default_rng(seed)
+        self.parents = None
+        self.parent_fitnesses = None
+
+    def tell(self, population, fitnesses):
+        if self.parents is None:
+            self.parents = [list(chrom) for chrom in population]
+            self.parent_fitnesses = list(fitnesses)
+        else:
+            for i, (trial, fitness) in enumerate(zip(population, fitnesses)):
+                if fitness_key(fitness) <= fitness_key(self.parent_fitnesses[i]):
+                    self.parents[i] = list(trial)
+                    self.parent_fitnesses[i] = fitness
+        self.population = self._trials()
+
+    def racing_cutoffs(self, racing_cutoff):
+        if self.parents is None:
+            return racing_cutoff
+        return [float(f) if fitness_tier(f) == 'full' and not getattr(f, 'censored', False) else None
+                for f in self.parent_fitnesses]
+
+    def _trials(self):
+        parents = np.asarray(self.parents, dtype=np.float64)
+        size, num_genes = parents.shape
+        best = parents[min(range(size), key=lambda i: fitness_key(self.parent_fitnesses[i]))]
+        trials = []
+        for i in range(size):
+            r1, r2 = self.rng.choice([j for j in range(size) if j != i], 2, replace=False)
+            mutant = parents[i] + self.weight * (best - parents[i]) + self.weight * (parents[r1] - parents[r2])
+            from_mutant = self.rng.random(num_genes) < self.crossover_rate
+            from_mutant[self.rng.integers(num_genes)] = True
+            trial = np.clip(np.rint(np.where(from_mutant, mutant, parents[i])), MIN_PHASE_DURATION, MAX_PHASE_DURATION)
+            if np.array_equal(trial, parents[i]):
+                # Differences that round to zero would re-evaluate the parent; perturb one gene instead.
+                trial[self.rng.integers(num_genes)] = self.rng.integers(MIN_PHASE_DURATION, MAX_PHASE_DURATION + 1)
+            trials.append(trial.astype(np.int64).tolist())
+        return trials
+
+    def state(self):
+        if self.parents is None:
+            return {}
+        return {
+            'parents': self.parents,
+            'parent_fitnesses': [_fitness_to_json(f) for f in self.parent_fitnesses],
+            'rng': self.rng.bit_generator.state,
+        }
+
+    def restore(self, checkpoint):
+        state = checkpoint['optimizer_state']
+        if state:
+            self.parents = state['parents']
+            self.parent_fitnesses = [_fitness_from_json(value) for value in state['parent_fitnesses']]
+            self.rng.bit_generator.state = state['rng']
+
+OPTIMIZERS = {'ga': GeneticOptimizer, 'de': DifferentialEvolution}
+
+def create_optimizer(name, population, engine=None, surrogate=None):
+    """Returns the optimizer called `name` ('ga' or 'de'), starting from `population`."""
+    if name == 'ga':
+        return GeneticOptimizer(population, engine, surrogate)
+    if name == 'de':
+        return DifferentialEvolution(population)
+    raise ValueError(f"Unknown optimizer '{name}'. Choose one of: {', '.join(OPTIMIZERS)}.")
+
+def append_run_report(record, filename=OPTIMIZER_REPORT_FILE):
+    """Appends the summary of a finished run (optimizer, simulations, evaluations-to-target, ...) as a JSON line."""
+    with open(filename, 'a') as f:
+        f.write(json.dumps(dict(record, time=time.time())) + "\n")
+
+def print_optimizer_comparison(scenario, target, filename=OPTIMIZER_REPORT_FILE):
+    """
+    Compares the runs recorded for `scenario` and `target` per optimizer: how many runs
+    reached the target and the median number of simulations they needed.
+    """
+    if not os.path.exists(filename):
+        return
+    runs = {}
+    with open(filename) as f:
+        for line in f:
+            record = json.loads(line)
+            if record['scenario'] == scenario and record['target'] == target:
+                runs.setdefault(record['optimizer'], []).append(record)
+    if not runs:
+        return
+
+    print(f"\n--- Evaluations to Target (fitness <= {target}) ---")
+    print(f"{'optimizer':<12} {'runs':>5} {'reached':>8} {'median simulations':>19} {'median best':>12}")
+    for name, records in sorted(runs.items()):
+        reached = [r['evaluations_to_target'] for r in records if r['evaluations_to_target'] is not None]
+        median_evaluations = f"{statistics.median(reached):.0f}" if reached else "-"
+        median_best = statistics.median(r['best_fitness'] for r in records)
+        print(f"{name:<12} {len(records):>5} {len(reached):>8} {median_evaluations:>19} {median_best:>12.2f}")
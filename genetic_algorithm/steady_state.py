@@ -0,0 +1,147 @@
+# genetic_algorithm/steady_state.py
+
+import asyncio
+import time
+from functools import partial
+from config import POPULATION_SIZE, NUM_WORKERS, RACING_ENABLED
+from .ga_core import selection, crossover, mutate
+from .ga_utilities import fitness_key, fitness_tier
+
+def _is_exact(fitness):
+    return fitness_tier(fitness) == 'full' and not getattr(fitness, 'censored', False)
+
+def run_steady_state(evaluator, initial_population, budget, timeout=None, concurrency=NUM_WORKERS, on_epoch=None,
+                     deadline=None):
+    """
+    Runs a steady-state GA without a generation barrier: every finished evaluation
+    inserts its chromosome into the population (replacing the worst individual once the
+    population is full, if the child is better) and immediately dispatches a new child
+    to the free worker. At most `concurrency` evaluations run at once, `budget`
+    evaluations are dispatched in total.
+
+    A `timeout` (seconds) is passed to every simulation, which then stops with a censored
+    lower bound. An evaluation still running twice the timeout after its worker began it
+    (e.g. a hung SUMO instance) is abandoned as a straggler: it is cancelled, which
+    kills and replaces its worker process (see ParallelEvaluator.evaluate_async).
+
+    A `deadline` (a time.monotonic() value) ends the run when it is reached, whatever the
+    budget: evaluations still running are abandoned the same way, and no simulation is
+    given a timeout beyond the deadline.
+
+    Every POPULATION_SIZE completed evaluations form an epoch: the best and average
+    fitness are recorded and `on_epoch(epoch)` is called, if given.
+    Returns a dict with the best chromosome and fitness, the histories and counters.
+    """
+    return asyncio.run(_steady_state(evaluator, list(initial_population), budget, timeout,
+                                     max(1, concurrency), on_epoch, deadline))
+
+async def _steady_state(evaluator, initial_population, budget, timeout, concurrency, on_epoch, deadline):
+    population_with_fitness = []
+    running = {}  # task -> {'chromosome', 'start'}; the start is None until a worker begins the evaluation
+    straggler_limit = 2 * timeout if timeout is not None else None
+    result = {
+        'best_chromosome': [], 'best_fitness': float('inf'),
+        'best_fitness_history': [], 'average_fitness_history': [],
+        'evaluations': 0, 'stopped_early': 0, 'stragglers': 0, 'deadline_reached': False,
+    }
+
+    def next_chromosome():
+        if initial_population:
+            return initial_population.pop(0)
+        return mutate(crossover(selection(population_with_fitness), selection(population_with_fitness)))
+
+    def racing_cutoff():
+        # A child is only kept if it beats the worst individual, so that is its cutoff.
+        if not RACING_ENABLED or len(population_with_fitness) < POPULATION_SIZE:
+            return None
+        worst = max((f for _, f in population_with_fitness), key=fitness_key)
+        return float(worst) if _is_exact(worst) else None
+
+    def insert(chromosome, fitness):
+        if len(population_with_fitness) < POPULATION_SIZE:
+            population_with_fitness.append((chromosome, fitness))
+            return
+        worst_index = max(range(len(population_with_fitness)),
+                          key=lambda i: fitness_key(population_with_fitness[i][1]))
+        if fitness_key(fitness) < fitness_key(population_with_fitness[worst_index][1]):
+            population_with_fitness[worst_index] = (chromosome, fitness)
+
+    def end_epoch():
+        best = min((f for _, f in population_with_fitness), key=fitness_key)
+        exact = [f for _, f in population_with_fitness if _is_exact(f)]
+        average = sum(exact) / len(exact) if exact else float('inf')
+        result['best_fitness_history'].append(best)
+        result['average_fitness_history'].append(average)
+        epoch = len(result['best_fitness_history'])
+        progress = f"{result['evaluations']}/{budget}" if budget != float('inf') else f"{result['evaluations']}"
+        print(f"Evaluations {progress}: best fitness {best:.2f} | "
+              f"average fitness {average:.2f} | {result['stopped_early']} stopped early, "
+              f"{result['stragglers']} stragglers abandoned")
+        if on_epoch is not None:
+            on_epoch(epoch)
+
+    dispatched = 0
+    while True:
+        while len(running) < concurrency and dispatched < budget and (initial_population or population_with_fitness):
+            chromosome = next_chromosome()
+            evaluation_timeout = timeout
+            if deadline is not None:
+                remaining = max(0.0, deadline - time.monotonic())
+                evaluation_timeout = remaining if timeout is None else min(timeout, remaining)
+            entry = {'chromosome': chromosome, 'start': None}
+            task = asyncio.ensure_future(evaluator.evaluate_async(
+                chromosome, racing_cutoff(), evaluation_timeout, on_start=partial(entry.__setitem__, 'start')
+            ))
+            running[task] = entry
+            dispatched += 1
+        if not running:
+            break
+
+        wait_timeout = None
+        if straggler_limit is not None:
+            now = time.monotonic()
+            # An evaluation that has not started yet cannot become a straggler before now + straggler_limit.
+            oldest_start = min(now if entry['start'] is None else entry['start'] for entry in running.values())
+            wait_timeout = max(0.0, oldest_start + straggler_limit - now)
+        if deadline is not None:
+            until_deadline = max(0.0, deadline - time.monotonic())
+            wait_timeout = until_deadline if wait_timeout is None else min(wait_timeout, until_deadline)
+        done, _ = await asyncio.wait(running, timeout=wait_timeout, return_when=asyncio.FIRST_COMPLETED)
+
+        finished = []
+        for task in done:
+            finished.append((running.pop(task)['chromosome'], task.result()))
+        if straggler_limit is not None:
+            now = time.monotonic()
+            for task, entry in list(running.items()):
+                if entry['start'] is not None and now - entry['start'] > straggler_limit:
+                    task.cancel()
+                    del running[task]
+                    result['stragglers'] += 1
+                    print(f"WARNING: Evaluation abandoned after {now - entry['start']:.1f}s (straggler), "
+                          f"its worker is restarted.")
+
+        for chromosome, fitness in finished:
+            result['evaluations'] += 1
+            if getattr(fitness, 'censored', False):
+                result['stopped_early'] += 1
+            if _is_exact(fitness) and fitness < result['best_fitness']:
+                result['best_fitness'] = fitness
+                result['best_chromosome'] = chromosome
+            insert(chromosome, fitness)
+            if result['evaluations'] % POPULATION_SIZE == 0:
+                end_epoch()
+
+        if deadline is not None and time.monotonic() >= deadline:
+            for task in running:
+                task.cancel()
+            if running:
+                print(f"INFO: Deadline reached, {len(running)} running evaluation(s) abandoned.")
+            running.clear()
+            result['deadline_reached'] = True
+            break
+
+    if population_with_fitness and result['evaluations'] % POPULATION_SIZE:
+        end_epoch()
+    result['population_with_fitness'] = sorted(population_with_fitness, key=lambda x: fitness_key(x[1]))
+    return result
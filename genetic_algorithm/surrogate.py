@@ -0,0 +1,93 @@
+# genetic_algorithm/surrogate.py
+
+from collections import OrderedDict
+import numpy as np
+from config import SURROGATE_MIN_SAMPLES, SURROGATE_MAX_SAMPLES, SURROGATE_RIDGE
+from .ga_utilities import fitness_tier
+
+def _rank_correlation(a, b):
+    """Spearman rank correlation of two equally long sequences (0 if undefined)."""
+    if len(a) < 2:
+        return 0.0
+    ranks_a = np.argsort(np.argsort(a)).astype(float)
+    ranks_b = np.argsort(np.argsort(b)).astype(float)
+    if ranks_a.std() == 0 or ranks_b.std() == 0:
+        return 0.0
+    return float(np.corrcoef(ranks_a, ranks_b)[0, 1])
+
+class SurrogateModel:
+    """
+    Ridge regression from chromosomes to fitness, trained online on every exact
+    full-fidelity evaluation. It is solved in its dual form, so the cost grows with the
+    number of samples kept (at most SURROGATE_MAX_SAMPLES) rather than with the
+    square of the chromosome length.
+    """
+
+    def __init__(self, min_samples=SURROGATE_MIN_SAMPLES, max_samples=SURROGATE_MAX_SAMPLES,
+                 ridge=SURROGATE_RIDGE):
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.ridge = ridge
+        self._samples = OrderedDict()
+        self._model = None
+        self._predictions = {}
+
+    def add(self, population, fitnesses):
+        """Adds evaluated individuals to the training set; censored and screening values are skipped."""
+        for chrom, fitness in zip(population, fitnesses):
+            if fitness_tier(fitness) != 'full' or getattr(fitness, 'censored', False) or fitness == float('inf'):
+                continue
+            key = tuple(chrom)
+            self._samples.pop(key, None)
+            self._samples[key] = float(fitness)
+            while len(self._samples) > self.max_samples:
+                self._samples.popitem(last=False)
+        self._model = None
+
+    def is_ready(self):
+        return len(self._samples) >= self.min_samples
+
+    def _fit(self):
+        X = np.array(list(self._samples.keys()), dtype=float)
+        y = np.array(list(self._samples.values()))
+        x_mean, y_mean = X.mean(axis=0), y.mean()
+        Xc = X - x_mean
+        alpha = np.linalg.solve(Xc @ Xc.T + self.ridge * np.eye(len(y)), y - y_mean)
+        self._model = (Xc.T @ alpha, x_mean, y_mean)
+
+    def predict(self, chromosomes):
+        """Predicts the fitness of each chromosome."""
+        if self._model is None:
+            self._fit()
+        weights, x_mean, y_mean = self._model
+        return (np.asarray(chromosomes, dtype=float) - x_mean) @ weights + y_mean
+
+    def select(self, candidates, count):
+        """
+        Returns the `count` candidates with the best predicted fitness, in ranking order.
+        Their predictions are remembered so that accuracy() can compare them with the
+        simulated values later.
+        """
+        predictions = self.predict(candidates)
+        best = np.argsort(predictions, kind='stable')[:count]
+        self._predictions = {tuple(candidates[i]): predictions[i] for i in best}
+        return [candidates[i] for i in best]
+
+    def accuracy(self, population, fitnesses):
+        """
+        Compares the predictions of the last select() with the simulated fitness values.
+        Returns (mean absolute error, rank correlation, number of compared individuals),
+        or None if nothing can be compared.
+        """
+        predicted, actual = [], []
+        for chrom, fitness in zip(population, fitnesses):
+            key = tuple(chrom)
+            if (key in self._predictions and fitness_tier(fitness) == 'full'
+                    and not getattr(fitness, 'censored', False) and fitness != float('inf')):
+                predicted.append(self._predictions[key])
+                actual.append(float(fitness))
+        self._predictions = {}
+        if not predicted:
+            return None
+        mae = float(np.mean(np.abs(np.array(predicted) - np.array(actual))))
+        return mae, _rank_correlation(predicted, actual), len(predicted)
@@ -1,31 +1,131 @@
 # main.py
 
 import os
-import matplotlib.pyplot as plt
-from sumo_simulation.sumo_config_gen import (
-    generate_network, generate_trips_and_routes, create_type_file, create_sumocfg
-)
-from sumo_simulation.sumo_runner import get_traffic_light_info, evaluate_fitness
-from genetic_algorithm.ga_core import create_chromosome, selection, crossover, mutate
-from genetic_algorithm.ga_utilities import load_chromosome, save_chromosome
+import random
+from sumo_simulation.sumo_config_gen import create_type_file, create_sumocfg
+from sumo_simulation.scenario_cache import ensure_scenario
+from sumo_simulation.sumo_runner import get_traffic_light_info, remove_run_directory
+from sumo_simulation.parallel_eval import ParallelEvaluator
+from sumo_simulation.fitness_cache import FitnessCache, scenario_fingerprint
+from sumo_simulation.warmup import ensure_warmup_state
+from sumo_simulation.instrumentation import TraceWriter, start_profiler
+from genetic_algorithm.ga_core import create_chromosome
+from genetic_algorithm.ga_vectorized import PopulationEngine
+from genetic_algorithm.checkpoint import save_checkpoint, load_checkpoint, restore_random_state
+from genetic_algorithm.surrogate import SurrogateModel
+from genetic_algorithm.steady_state import run_steady_state
+from genetic_algorithm.islands import run_islands
+from genetic_algorithm.optimizers import create_optimizer, append_run_report, print_optimizer_comparison
+from genetic_algorithm.ga_utilities import load_chromosome, save_chromosome, fitness_key, fitness_tier
 from config import (
-    NET_FILE, ROUTE_FILE, POPULATION_SIZE, NUM_GENERATIONS,
-    BEST_CHROMOSOME_FILE
+    POPULATION_SIZE, NUM_GENERATIONS,
+    BEST_CHROMOSOME_FILE, NUM_WORKERS, FITNESS_CACHE_ENABLED, RACING_ENABLED,
+    RACING_CUTOFF_QUANTILE, MULTI_FIDELITY_ENABLED, FULL_FIDELITY_TOP_K, GA_ENGINE,
+    CHECKPOINT_ENABLED, CHECKPOINT_FILE, SURROGATE_ENABLED, TRACE_ENABLED,
+    TRACE_FILE, GA_MODE, EVALUATION_BUDGET, EVALUATION_TIMEOUT, ISLAND_COUNT, MIGRATION_INTERVAL,
+    MIGRATION_TOPOLOGY, OPTIMIZER, TARGET_FITNESS, PLOT_ENABLED, GA_SEED, prepare_environment
 )
 
+def ignored_settings():
+    """
+    Returns the settings that are set but not applied by the selected mode: the island
+    model and the steady-state GA only support part of the generational loop's features.
+    """
+    if ISLAND_COUNT > 1:
+        unused = {'OPTIMIZER': OPTIMIZER != 'ga', 'GA_MODE': GA_MODE == 'steady_state'}
+    elif GA_MODE == 'steady_state':
+        unused = {'OPTIMIZER': OPTIMIZER != 'ga', 'GA_ENGINE': GA_ENGINE != 'python',
+                  'SURROGATE_ENABLED': SURROGATE_ENABLED}
+    else:
+        return []
+    unused.update(CHECKPOINT_ENABLED=CHECKPOINT_ENABLED, MULTI_FIDELITY_ENABLED=MULTI_FIDELITY_ENABLED)
+    return [name for name, is_set in unused.items() if is_set]
+
+def report_evaluation_stats(evaluator, cache, trace_writer, generation):
+    """Prints the cache, SUMO session and trace statistics, and writes the generation's trace records."""
+    if cache is not None:
+        print(f"Fitness cache: {cache.hits}/{cache.lookups} hits ({cache.hit_rate():.0%})")
+    stats = evaluator.session_stats()
+    if stats['startups']:
+        print(f"SUMO sessions: {stats['startups']} startups ({stats['startup_time'] / stats['startups']:.2f}s avg), "
+              f"{stats['resets']} resets ({stats['reset_time'] / max(1, stats['resets']):.2f}s avg)")
+    if trace_writer is not None:
+        summary = trace_writer.write_generation(generation, evaluator.pop_trace_records())
+        if summary['evaluations']:
+            phases = ", ".join(f"{name} {seconds:.3f}s" for name, seconds in summary['mean_timers'].items())
+            calls = summary['counters'].get('traci_calls', 0) / summary['evaluations']
+            local_calls = summary['counters'].get('local_calls', 0) / summary['evaluations']
+            print(f"Per simulation ({summary['evaluations']}): {phases}, {calls:.0f} TraCI calls "
+                  f"(+{local_calls:.0f} subscription reads)")
+
+def run_steady_state_mode(evaluator, population, cache, trace_writer):
+    """Runs the asynchronous steady-state GA and returns its result (see steady_state.py)."""
+    budget = EVALUATION_BUDGET or POPULATION_SIZE * NUM_GENERATIONS
+    print(f"\n--- Steady-State Optimization ({budget} evaluations) ---")
+
+    def on_epoch(epoch):
+        if cache is not None:
+            cache.flush()
+        report_evaluation_stats(evaluator, cache, trace_writer, epoch - 1)
+
+    return run_steady_state(evaluator, population, budget, EVALUATION_TIMEOUT, on_epoch=on_epoch)
+
+def run_island_mode(traffic_light_info, seeds, warmup, trace_writer):
+    """
+    Runs ISLAND_COUNT populations in parallel processes (see islands.py). The first island
+    starts from the `seeds` chromosomes, e.g. the loaded best chromosome; the islands draw
+    the rest of their populations themselves, so runs with a GA_SEED are reproducible.
+    Returns the island results.
+    """
+    print(f"\n--- Island Model: {ISLAND_COUNT} islands, {MIGRATION_TOPOLOGY} migration "
+          f"every {MIGRATION_INTERVAL} generations ---")
+    populations = [seeds] + [[] for _ in range(ISLAND_COUNT - 1)]
+
+    def on_generation(island, generation, best, average, records):
+        print(f"Island {island + 1}, generation {generation + 1}/{NUM_GENERATIONS}: "
+              f"best fitness {best:.2f} | average fitness {average:.2f}")
+        if trace_writer is not None:
+            trace_writer.write_generation(generation, records, island=island)
+
+    return run_islands(traffic_light_info, populations, warmup, on_generation=on_generation)
+
+def plot_convergence(histories, x_label='Generation', filename='convergence_plot.png'):
+    """
+    Plots the best and mean fitness per generation. `histories` maps a label to a pair
+    of (best, mean) histories; a single population uses the empty label.
+    matplotlib is only imported here, with the non-interactive Agg backend.
+    """
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        plt.figure(figsize=(12, 7))
+        for label, (best_history, average_history) in histories.items():
+            prefix = f"{label}: " if label else ""
+            generations = range(1, len(best_history) + 1)
+            plt.plot(generations, best_history, 'o-', label=f'{prefix}Best fitness per generation')
+            plt.plot(generations, average_history, 's--', label=f'{prefix}Mean fitness per generation')
+        plt.xlabel(x_label)
+        plt.ylabel('Fitness')
+        plt.title('Convergence of GA')
+        plt.legend()
+        plt.grid(True)
+        plt.xticks(range(1, max(len(best) for best, _ in histories.values()) + 1))
+        plt.savefig(filename)
+        print(f"\nINFO: Convergence plot saved to '{filename}'.")
+    except Exception as e:
+        print(f"WARNING: Error while creating the plot: {e}")
+
 def run_genetic_algorithm(initial_chromosome=None):
     """
     Executes the genetic algorithm for traffic light optimization.
     """
     print("\n--- Preparing Simulation Environment ---")
+    start_profiler("main")
+    if GA_SEED is not None:
+        random.seed(GA_SEED)
 
-    if not os.path.exists(NET_FILE) or not os.path.exists(ROUTE_FILE):
-        print(f"INFO: Scenario files not found. Generating a NEW traffic scenario...")
-        generate_network()
-        generate_trips_and_routes()
-    else:
-        print(f"INFO: Using EXISTING traffic scenario (.net.xml and .rou.xml files).")
-
+    ensure_scenario()
     create_type_file()
     create_sumocfg()
     print("INFO: Configuration files (.sumocfg, .type.xml) ready.")
@@ -40,6 +140,7 @@ def run_genetic_algorithm(initial_chromosome=None):
     print(f"INFO: {len(traffic_light_info)} traffic lights found, requiring a chromosome of {num_genes} genes.")
 
     print("\n--- Initializing Population ---")
+    engine = PopulationEngine() if GA_ENGINE == 'numpy' else None
     population = []
     is_initial_valid = (initial_chromosome is not None and
                         isinstance(initial_chromosome, list) and
@@ -49,54 +150,164 @@ def run_genetic_algorithm(initial_chromosome=None):
     if is_initial_valid:
         print("INFO: Valid initial chromosome provided and will be injected into the population.")
         population.append(initial_chromosome)
-        for _ in range(POPULATION_SIZE - 1):
-            population.append(create_chromosome(traffic_light_info))
+        if engine is not None:
+            population.extend(engine.create_population(POPULATION_SIZE - 1, num_genes).tolist())
+        else:
+            for _ in range(POPULATION_SIZE - 1):
+                population.append(create_chromosome(traffic_light_info))
     else:
         if initial_chromosome is not None:
              print(f"WARNING: Provided initial chromosome is invalid.")
         print("INFO: Creating a fully random initial population.")
-        for _ in range(POPULATION_SIZE):
-            population.append(create_chromosome(traffic_light_info))
+        if engine is not None:
+            population.extend(engine.create_population(POPULATION_SIZE, num_genes).tolist())
+        else:
+            for _ in range(POPULATION_SIZE):
+                population.append(create_chromosome(traffic_light_info))
 
     best_fitness_history = []
     average_fitness_history = []
     best_overall_fitness = float('inf')
     best_overall_chromosome = []
+    racing_cutoff = None
+    start_generation = 0
+    simulations = 0
+    evaluations_to_target = None
+    surrogate = SurrogateModel() if SURROGATE_ENABLED else None
+
+    generational = GA_MODE != 'steady_state' and ISLAND_COUNT <= 1
+    ignored = ignored_settings()
+    if ignored:
+        mode = "The island model" if ISLAND_COUNT > 1 else "The steady-state GA"
+        print(f"WARNING: {mode} does not apply {', '.join(ignored)}; these settings are ignored.")
+    fingerprint = scenario_fingerprint()
+    checkpoint = load_checkpoint() if CHECKPOINT_ENABLED and generational else None
+    if checkpoint is not None:
+        if (checkpoint['scenario'] == fingerprint and checkpoint['optimizer'] == OPTIMIZER
+                and len(checkpoint['next_population']) == POPULATION_SIZE
+                and all(len(chrom) == num_genes for chrom in checkpoint['next_population'])):
+            print(f"INFO: Resuming the interrupted run after generation {checkpoint['generation'] + 1}.")
+            restore_random_state(checkpoint, engine)
+            population = checkpoint['next_population']
+            best_fitness_history = checkpoint['best_fitness_history']
+            average_fitness_history = checkpoint['average_fitness_history']
+            best_overall_fitness = checkpoint['best_overall_fitness']
+            best_overall_chromosome = checkpoint['best_overall_chromosome']
+            racing_cutoff = checkpoint['racing_cutoff']
+            start_generation = checkpoint['generation'] + 1
+            simulations = checkpoint['simulations']
+            evaluations_to_target = checkpoint['evaluations_to_target']
+        else:
+            print(f"WARNING: Checkpoint '{CHECKPOINT_FILE}' does not match this scenario or optimizer and is ignored.")
+            checkpoint = None
+    optimizer = None
+    if generational:
+        optimizer = create_optimizer(OPTIMIZER, population, engine, surrogate)
+        if checkpoint is not None:
+            optimizer.restore(checkpoint)
+
+    print(f"INFO: Evaluating with {NUM_WORKERS} SUMO worker process(es).")
+    warmup = ensure_warmup_state()
+    trace_writer = TraceWriter() if TRACE_ENABLED else None
+    cache = evaluator = None
+    if ISLAND_COUNT <= 1:
+        cache = FitnessCache(fingerprint) if FITNESS_CACHE_ENABLED else None
+        evaluator = ParallelEvaluator(traffic_light_info, NUM_WORKERS, cache, warmup)
+    histories = None
 
-    for gen in range(NUM_GENERATIONS):
-        print(f"\n--- Generation {gen + 1}/{NUM_GENERATIONS} ---")
+    if ISLAND_COUNT > 1:
+        result = run_island_mode(traffic_light_info, population[:1] if is_initial_valid else [], warmup, trace_writer)
+        histories = {f"Island {i + 1}": history for i, history in enumerate(result['histories'])}
+        best_fitness_history = [min(generation) for generation in zip(*(best for best, _ in result['histories']))]
+        average_fitness_history = [sum(generation) / len(generation)
+                                   for generation in zip(*(average for _, average in result['histories']))]
+        best_overall_fitness = result['best_fitness']
+        best_overall_chromosome = result['best_chromosome']
+    elif GA_MODE == 'steady_state':
+        result = run_steady_state_mode(evaluator, population, cache, trace_writer)
+        best_fitness_history = result['best_fitness_history']
+        average_fitness_history = result['average_fitness_history']
+        best_overall_fitness = result['best_fitness']
+        best_overall_chromosome = result['best_chromosome']
+    else:
+        for gen in range(start_generation, NUM_GENERATIONS):
+            print(f"\n--- Generation {gen + 1}/{NUM_GENERATIONS} ---")
+
+            population = optimizer.ask()
+            cutoffs = optimizer.racing_cutoffs(racing_cutoff) if RACING_ENABLED else None
+            if MULTI_FIDELITY_ENABLED:
+                fitnesses = evaluator.evaluate_multi_fidelity(population, FULL_FIDELITY_TOP_K, cutoffs)
+            else:
+                fitnesses = evaluator.evaluate(population, cutoffs)
+            population_with_fitness = []
+            for i, (chrom, fitness) in enumerate(zip(population, fitnesses)):
+                notes = "" if fitness_tier(fitness) == 'full' else f" ({fitness_tier(fitness)} tier)"
+                if getattr(fitness, 'censored', False):
+                    notes += " (censored, lower bound)"
+                print(f"  Individual {i+1}/{POPULATION_SIZE}: Fitness = {fitness:.2f}{notes}")
+                population_with_fitness.append((chrom, fitness))
+
+            population_with_fitness.sort(key=lambda x: fitness_key(x[1]))
+            best_gen_chromosome, best_gen_fitness = population_with_fitness[0]
 
-        population_with_fitness = []
-        for i, chrom in enumerate(population):
-            print(f"  Evaluating individual {i+1}/{POPULATION_SIZE}...", end=' ', flush=True)
-            fitness = evaluate_fitness(chrom, traffic_light_info)
-            population_with_fitness.append((chrom, fitness))
-            print(f"Fitness = {fitness:.2f}")
+            # Statistics only use full-fidelity values, so tiers are never mixed.
+            current_fitnesses = [f for _, f in population_with_fitness if fitness_tier(f) == 'full']
+            avg_gen_fitness = sum(current_fitnesses) / len(current_fitnesses)
 
-        population_with_fitness.sort(key=lambda x: x[1])
-        best_gen_chromosome, best_gen_fitness = population_with_fitness[0]
+            best_fitness_history.append(best_gen_fitness)
+            average_fitness_history.append(avg_gen_fitness)
 
-        current_fitnesses = [f for _, f in population_with_fitness]
-        avg_gen_fitness = sum(current_fitnesses) / len(current_fitnesses)
+            is_exact = fitness_tier(best_gen_fitness) == 'full' and not getattr(best_gen_fitness, 'censored', False)
+            if is_exact and best_gen_fitness < best_overall_fitness:
+                best_overall_fitness = best_gen_fitness
+                best_overall_chromosome = best_gen_chromosome
 
-        best_fitness_history.append(best_gen_fitness)
-        average_fitness_history.append(avg_gen_fitness)
+            print(f"Best fitness of generation: {best_gen_fitness:.2f} | Average fitness: {avg_gen_fitness:.2f}")
+            if RACING_ENABLED:
+                num_censored = sum(1 for f in fitnesses if getattr(f, 'censored', False))
+                steps_saved = sum(getattr(f, 'steps_saved', 0) for f in fitnesses)
+                print(f"Racing: {num_censored} simulations stopped early, {steps_saved} simulated steps saved")
+                cutoff_index = int(RACING_CUTOFF_QUANTILE * (len(current_fitnesses) - 1))
+                racing_cutoff = float(current_fitnesses[cutoff_index])
+            report_evaluation_stats(evaluator, cache, trace_writer, gen)
 
-        if best_gen_fitness < best_overall_fitness:
-            best_overall_fitness = best_gen_fitness
-            best_overall_chromosome = best_gen_chromosome
+            if TARGET_FITNESS is not None and evaluations_to_target is None and best_overall_fitness <= TARGET_FITNESS:
+                evaluations_to_target = simulations + evaluator.simulations
+                print(f"Target fitness {TARGET_FITNESS} reached after {evaluations_to_target} simulations.")
 
-        print(f"Best fitness of generation: {best_gen_fitness:.2f} | Average fitness: {avg_gen_fitness:.2f}")
+            optimizer.tell(population, fitnesses)
 
-        new_population = [best_gen_chromosome]
-        while len(new_population) < POPULATION_SIZE:
-            parent1 = selection(population_with_fitness)
-            parent2 = selection(population_with_fitness)
-            child = crossover(parent1, parent2)
-            mutated_child = mutate(child)
-            new_population.append(mutated_child)
+            if CHECKPOINT_ENABLED:
+                save_checkpoint({
+                    'generation': gen, 'population': population, 'fitnesses': fitnesses,
+                    'next_population': optimizer.ask(), 'best_fitness_history': best_fitness_history,
+                    'average_fitness_history': average_fitness_history,
+                    'best_overall_chromosome': best_overall_chromosome,
+                    'best_overall_fitness': best_overall_fitness, 'racing_cutoff': racing_cutoff,
+                    'optimizer': optimizer.name, 'optimizer_state': optimizer.state(),
+                    'simulations': simulations + evaluator.simulations,
+                    'evaluations_to_target': evaluations_to_target, 'scenario': fingerprint,
+                }, engine=engine)
 
-        population = new_population
+        simulations += evaluator.simulations
+        print(f"\nINFO: The '{optimizer.name}' optimizer ran {simulations} simulations.")
+        scenario = fingerprint[:16]
+        append_run_report({
+            'optimizer': optimizer.name, 'scenario': scenario, 'target': TARGET_FITNESS,
+            'evaluations_to_target': evaluations_to_target, 'simulations': simulations,
+            'best_fitness': float(best_overall_fitness), 'generations': NUM_GENERATIONS,
+            'population_size': POPULATION_SIZE,
+        })
+        if TARGET_FITNESS is not None:
+            print_optimizer_comparison(scenario, TARGET_FITNESS)
+
+    if evaluator is not None:
+        evaluator.close()
+    if trace_writer is not None:
+        trace_writer.close()
+        print(f"INFO: Evaluation trace written to '{TRACE_FILE}'.")
+    if CHECKPOINT_ENABLED and generational and os.path.exists(CHECKPOINT_FILE):
+        os.remove(CHECKPOINT_FILE)
 
     print("\n--- Optimization Complete! ---")
     print(f"Best overall fitness found: {best_overall_fitness:.2f}")
@@ -109,23 +320,14 @@ def run_genetic_algorithm(initial_chromosome=None):
     for i, (best_f, avg_f) in enumerate(zip(best_fitness_history, average_fitness_history)):
         print(f"Generation {i+1}: Best Fitness = {best_f:.2f}, Average Fitness = {avg_f:.2f}")
 
-    try:
-        plt.figure(figsize=(12, 7))
-        plt.plot(range(1, NUM_GENERATIONS + 1), best_fitness_history, 'o-', label='Best fitness per generation')
-        plt.plot(range(1, NUM_GENERATIONS + 1), average_fitness_history, 's--', label='Mean fitness per generation')
-        plt.xlabel('Generation')
-        plt.ylabel('Fitness')
-        plt.title('Convergence of GA')
-        plt.legend()
-        plt.grid(True)
-        plt.xticks(range(1, NUM_GENERATIONS + 1))
-        convergence_plot_file = 'convergence_plot.png'
-        plt.savefig(convergence_plot_file)
-        print(f"\nINFO: Convergence plot saved to '{convergence_plot_file}'.")
-    except Exception as e:
-        print(f"WARNING: Error while creating the plot: {e}")
+    if histories is None:
+        histories = {"": (best_fitness_history, average_fitness_history)}
+    if PLOT_ENABLED:
+        plot_convergence(histories, 'Generation' if GA_MODE != 'steady_state' else f'Evaluations (x{POPULATION_SIZE})')
 
-if __name__ == "__main__":
+def main():
+    """Runs the optimizer, starting from the best chromosome saved by a previous run if there is one."""
+    prepare_environment()
     print("=========================================================")
     print("    Starting Traffic Light Optimizer with GA & SUMO      ")
     print("=========================================================")
@@ -133,18 +335,25 @@ if __name__ == "__main__":
     print(f"\n>>> Step 1: Attempting to load best chromosome from '{BEST_CHROMOSOME_FILE}'...")
     loaded_chromosome = load_chromosome()
 
-    if loaded_chromosome:
-        print("\n>>> Step 2: Launching Genetic Algorithm.")
-        print("INFO: A previous chromosome was loaded and will be used as a starting point.")
-        run_genetic_algorithm(initial_chromosome=loaded_chromosome)
-    else:
-        print("\n>>> Step 2: Launching Genetic Algorithm.")
-        print("INFO: No valid chromosome found. Starting with a fully random population.")
-        run_genetic_algorithm(initial_chromosome=None)
+    try:
+        if loaded_chromosome:
+            print("\n>>> Step 2: Launching Genetic Algorithm.")
+            print("INFO: A previous chromosome was loaded and will be used as a starting point.")
+            run_genetic_algorithm(initial_chromosome=loaded_chromosome)
+        else:
+            print("\n>>> Step 2: Launching Genetic Algorithm.")
+            print("INFO: No valid chromosome found. Starting with a fully random population.")
+            run_genetic_algorithm(initial_chromosome=None)
+    finally:
+        # The worker directories also go when the run fails or is interrupted.
+        remove_run_directory()
 
     print("\n" + "="*70)
     print("Program finished.")
     print(f"The best result from this session has been appended to '{BEST_CHROMOSOME_FILE}'.")
     print("To continue optimization on the same scenario, simply re-run the script.")
-    print("To start a new optimization on a new scenario, delete the .net.xml and .rou.xml files in SUMO_config.")
+    print("Changing the OSM map, VEHICLE_COUNT, SIMULATION_DURATION or SCENARIO_SEED builds (or reuses) the matching scenario.")
     print("="*70 + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# service.py
+
+import json
+import os
+import random
+import shutil
+import time
+from sumo_simulation.sumo_config_gen import create_type_file, create_sumocfg, run_duarouter, count_vehicles
+from sumo_simulation.scenario_cache import ensure_scenario, install_file
+from sumo_simulation.sumo_runner import get_traffic_light_info, run_directory, remove_run_directory
+from sumo_simulation.parallel_eval import ParallelEvaluator
+from sumo_simulation.fitness_cache import FitnessCache, scenario_fingerprint
+from sumo_simulation.warmup import ensure_warmup_state
+from sumo_simulation.tls_program import TlsProgram
+from sumo_simulation.instrumentation import start_profiler
+from genetic_algorithm.ga_core import create_chromosome
+from genetic_algorithm.steady_state import run_steady_state
+from genetic_algorithm.ga_utilities import load_chromosome, save_chromosome
+from config import (
+    NET_FILE, ROUTE_FILE, SUMOCFG_FILE, POPULATION_SIZE, NUM_WORKERS, FITNESS_CACHE_ENABLED, EVALUATION_BUDGET,
+    EVALUATION_TIMEOUT, SERVICE_WATCH_DIR, SERVICE_OUTPUT_DIR, SERVICE_DEADLINE, SERVICE_POLL_INTERVAL,
+    GA_SEED, prepare_environment
+)
+
+DEMAND_SUFFIXES = (".trips.xml", ".rou.xml")
+CURRENT_PLAN_FILE = "current_plan.add.xml"
+
+def window_name(path):
+    """Returns the name of a demand window: its file name without the .trips.xml/.rou.xml suffix."""
+    filename = os.path.basename(path)
+    for suffix in DEMAND_SUFFIXES:
+        if filename.endswith(suffix):
+            return filename[:-len(suffix)]
+    return filename
+
+def next_window(watch_dir=SERVICE_WATCH_DIR):
+    """
+    Returns the newest demand file of the watched directory, or None. Older files that
+    piled up meanwhile are outdated by it and moved to processed/ without optimization.
+    Files must be dropped atomically (written elsewhere, then renamed into the directory).
+    """
+    demand_files = sorted(
+        (os.path.join(watch_dir, name) for name in os.listdir(watch_dir) if name.endswith(DEMAND_SUFFIXES)),
+        key=os.path.getmtime
+    )
+    if not demand_files:
+        return None
+    processed_dir = os.path.join(watch_dir, "processed")
+    for outdated in demand_files[:-1]:
+        print(f"WARNING: Demand window '{window_name(outdated)}' is outdated by a newer one and skipped.")
+        shutil.move(outdated, os.path.join(processed_dir, os.path.basename(outdated)))
+    window_file = os.path.join(processed_dir, os.path.basename(demand_files[-1]))
+    shutil.move(demand_files[-1], window_file)
+    return window_file
+
+def prepare_routes(window_file, route_file):
+    """Writes the routes of a demand window to `route_file`, routing it with duarouter if it only contains trips."""
+    if window_file.endswith(".rou.xml"):
+        install_file(window_file, route_file)
+        return
+    print(f"INFO: Routing the trips of window '{window_name(window_file)}'...")
+    run_duarouter(NET_FILE, window_file, route_file)
+
+def publish_plan(tls_program, name, chromosome, fitness, evaluations):
+    """
+    Writes the plan of a window as a <tlLogic> additional file, to SERVICE_OUTPUT_DIR/<window>.add.xml
+    and atomically to current_plan.add.xml, next to a JSON summary of the plan.
+    """
+    plan_file = os.path.join(SERVICE_OUTPUT_DIR, name + ".add.xml")
+    tls_program.write_additional(chromosome, plan_file)
+    install_file(plan_file, os.path.join(SERVICE_OUTPUT_DIR, CURRENT_PLAN_FILE))
+
+    summary_file = os.path.join(SERVICE_OUTPUT_DIR, "current_plan.json")
+    with open(summary_file + ".tmp", 'w') as f:
+        json.dump({'window': name, 'fitness': float(fitness), 'chromosome': chromosome,
+                   'evaluations': evaluations, 'time': time.time()}, f)
+    os.replace(summary_file + ".tmp", summary_file)
+    save_chromosome(chromosome)
+    print(f"INFO: Plan of window '{name}' (fitness {fitness:.2f}) published to '{plan_file}'.")
+
+def optimize_window(window_file, population, traffic_light_info, tls_program):
+    """
+    Re-optimizes the traffic lights for one demand window with the steady-state GA,
+    starting from `population`, until SERVICE_DEADLINE seconds after the window arrived
+    (or EVALUATION_BUDGET evaluations). Publishes the best plan and returns the final
+    population, to warm-start the next window.
+    """
+    name = window_name(window_file)
+    deadline = time.monotonic() + SERVICE_DEADLINE
+    print(f"\n--- Window '{name}': re-optimizing for at most {SERVICE_DEADLINE}s ---")
+
+    # The window gets its own route file and configuration in the run directory, so the
+    # shared scenario files (and any optimize run using them) are never touched.
+    window_dir = os.path.join(run_directory(), "window_" + name)
+    os.makedirs(window_dir, exist_ok=True)
+    route_file = os.path.join(window_dir, os.path.basename(ROUTE_FILE))
+    sumocfg_file = os.path.join(window_dir, os.path.basename(SUMOCFG_FILE))
+    prepare_routes(window_file, route_file)
+    create_sumocfg(sumocfg_file, route_file)
+    warmup = ensure_warmup_state(route_file, sumocfg_file, window_dir)
+    # Fitness values are normalized by the window's own number of vehicles.
+    vehicle_count = count_vehicles(route_file)
+    print(f"INFO: Window '{name}' holds {vehicle_count} vehicles.")
+    cache = FitnessCache(scenario_fingerprint(route_file, sumocfg_file)) if FITNESS_CACHE_ENABLED else None
+    evaluator = ParallelEvaluator(traffic_light_info, NUM_WORKERS, cache, warmup, sumocfg_file=sumocfg_file,
+                                  vehicle_count=vehicle_count)
+    try:
+        result = run_steady_state(evaluator, population, EVALUATION_BUDGET or float('inf'),
+                                  EVALUATION_TIMEOUT, deadline=deadline)
+        if result['best_chromosome']:
+            publish_plan(tls_program, name, result['best_chromosome'], result['best_fitness'], result['evaluations'])
+        else:
+            print(f"WARNING: No complete evaluation before the deadline of window '{name}'. The current plan is kept.")
+    finally:
+        evaluator.close()
+        shutil.rmtree(window_dir, ignore_errors=True)
+
+    next_population = [chrom for chrom, _ in result['population_with_fitness']]
+    # Individuals that were never evaluated (deadline) come back from the previous population.
+    for chrom in population:
+        if len(next_population) >= POPULATION_SIZE:
+            break
+        if chrom not in next_population:
+            next_population.append(chrom)
+    while len(next_population) < POPULATION_SIZE:
+        next_population.append(create_chromosome(traffic_light_info))
+    return next_population
+
+def run_service():
+    """
+    Watches SERVICE_WATCH_DIR and re-optimizes the traffic light plan for every demand
+    window dropped into it, until interrupted.
+    """
+    prepare_environment()
+    print("\n--- Preparing Simulation Environment ---")
+    start_profiler("service")
+    if GA_SEED is not None:
+        random.seed(GA_SEED)
+    ensure_scenario()
+    create_type_file()
+    create_sumocfg()
+
+    traffic_light_info = get_traffic_light_info()
+    if not traffic_light_info:
+        print("WARNING – No traffic lights found. Optimization is pointless.")
+        return
+    tls_program = TlsProgram(traffic_light_info)
+    num_genes = len(tls_program.gene_index)
+
+    # The first window starts from the best known plan, if it fits the network.
+    population = []
+    best_known = load_chromosome()
+    if best_known and len(best_known) == num_genes:
+        population.append(best_known)
+    while len(population) < POPULATION_SIZE:
+        population.append(create_chromosome(traffic_light_info))
+
+    os.makedirs(os.path.join(SERVICE_WATCH_DIR, "processed"), exist_ok=True)
+    os.makedirs(SERVICE_OUTPUT_DIR, exist_ok=True)
+    print(f"INFO: Watching '{SERVICE_WATCH_DIR}' for demand windows ({', '.join(DEMAND_SUFFIXES)} files).")
+    try:
+        while True:
+            window_file = next_window()
+            if window_file is None:
+                time.sleep(SERVICE_POLL_INTERVAL)
+                continue
+            population = optimize_window(window_file, population, traffic_light_info, tls_program)
+    except KeyboardInterrupt:
+        print("\nINFO: Service stopped.")
+    finally:
+        remove_run_directory()
+
+if __name__ == "__main__":
+    run_service()
@@ -0,0 +1,68 @@
+# sumo_simulation/backends.py
+
+import sys
+from config import SIM_BACKEND
+
+class TraciBackend:
+    """
+    Runs SUMO as a separate process and talks to it over a TraCI socket.
+    Any number of simulations can run side by side, each under its own label.
+    traci is imported when the backend is created, not when this module is imported.
+    """
+    name = 'traci'
+
+    def __init__(self):
+        import traci
+        self._traci = traci
+        self.errors = (traci.TraCIException, traci.exceptions.FatalTraCIError)
+
+    def start(self, sumo_cmd, label):
+        """
+        Starts a simulation and returns its connection object. traci picks a free port
+        (and retries with another one if it is taken meanwhile), so concurrent runs on
+        the same host never collide.
+        """
+        self._traci.start(sumo_cmd, port=None, label=label)
+        return self._traci.getConnection(label)
+
+class LibsumoBackend:
+    """
+    Runs SUMO inside the current process through libsumo, without a socket or a child process.
+    libsumo supports a single simulation per process, so parallel evaluation relies on the
+    process-per-worker layout of ParallelEvaluator.
+    """
+    name = 'libsumo'
+
+    def __init__(self):
+        import traci
+        try:
+            import libsumo
+        except ImportError as e:
+            print(f"CRITICAL – SIM_BACKEND is 'libsumo' but libsumo cannot be imported. Error: {e}")
+            sys.exit(1)
+        self._libsumo = libsumo
+        self.errors = (traci.TraCIException, traci.exceptions.FatalTraCIError, libsumo.TraCIException)
+
+    def start(self, sumo_cmd, label):
+        """Starts the in-process simulation and returns the libsumo module as its connection."""
+        if self._libsumo.simulation.isLoaded():
+            raise self._libsumo.TraCIException("libsumo already runs a simulation in this process.")
+        self._libsumo.start(sumo_cmd)
+        return self._libsumo
+
+BACKENDS = {
+    'traci': TraciBackend,
+    'libsumo': LibsumoBackend,
+}
+
+_backend = None
+
+def get_backend():
+    """Returns the simulation backend selected by SIM_BACKEND, created once per process."""
+    global _backend
+    if _backend is None:
+        if SIM_BACKEND not in BACKENDS:
+            print(f"CRITICAL – Unknown SIM_BACKEND '{SIM_BACKEND}'. Choose one of: {', '.join(BACKENDS)}.")
+            sys.exit(1)
+        _backend = BACKENDS[SIM_BACKEND]()
+    return _backend
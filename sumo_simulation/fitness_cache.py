@@ -0,0 +1,143 @@
+# sumo_simulation/fitness_cache.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from config import (
+    NET_FILE, ROUTE_FILE, SUMOCFG_FILE, TYPE_FILE, STEP_LENGTH, SIM_STEPS, VEHICLE_COUNT,
+    SIMULATION_DURATION, WARMUP_DURATION, MIN_PHASE_DURATION, MAX_PHASE_DURATION, FITNESS_CACHE_FILE,
+    FITNESS_CACHE_MEMORY_SIZE, FITNESS_CACHE_DISK_SIZE
+)
+
+def scenario_fingerprint(route_file=ROUTE_FILE, sumocfg_file=SUMOCFG_FILE):
+    """
+    Hashes the scenario files and the simulation parameters that influence a fitness value.
+    `route_file` and `sumocfg_file` default to the files of the base scenario.
+    """
+    digest = hashlib.sha256()
+    for path in (NET_FILE, route_file, sumocfg_file, TYPE_FILE):
+        digest.update(os.path.basename(path).encode())
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    digest.update(f"{STEP_LENGTH}|{SIM_STEPS}|{VEHICLE_COUNT}|{SIMULATION_DURATION}|{WARMUP_DURATION}".encode())
+    return digest.hexdigest()
+
+def clamp_chromosome(chromosome, num_genes):
+    """
+    Returns the chromosome as the simulation sees it: truncated to the number of genes
+    and clamped to the allowed phase durations.
+    """
+    return tuple(max(MIN_PHASE_DURATION, min(MAX_PHASE_DURATION, gene)) for gene in chromosome[:num_genes])
+
+class FitnessCache:
+    """
+    Memoizes fitness values by (scenario fingerprint, fidelity tier, clamped chromosome).
+    Recent entries are kept in an in-memory LRU dict, all entries in an SQLite file
+    so that they survive across runs. Both levels are bounded and evict the least
+    recently used entries. Writes to the file are buffered until flush(), which applies
+    them in one short transaction, so several processes (e.g. islands) can share it.
+    """
+
+    def __init__(self, fingerprint, filename=FITNESS_CACHE_FILE,
+                 memory_size=FITNESS_CACHE_MEMORY_SIZE, disk_size=FITNESS_CACHE_DISK_SIZE):
+        self.fingerprint = fingerprint
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self.hits = 0
+        self.lookups = 0
+        self._memory = OrderedDict()
+        self._pending = {}  # (scenario, chromosome) -> fitness, not yet written
+        self._used = {}  # (scenario, chromosome) -> last use, not yet written
+        # Waits for flushes of other processes instead of failing with "database is locked".
+        self._db = sqlite3.connect(filename, timeout=60)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS fitness ("
+            "scenario TEXT, chromosome TEXT, fitness REAL, last_used REAL, "
+            "PRIMARY KEY (scenario, chromosome))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS fitness_last_used ON fitness (last_used)")
+        self._db.commit()
+
+    @staticmethod
+    def _key(chromosome):
+        return ",".join(map(str, chromosome))
+
+    def _scenario(self, fidelity):
+        if fidelity is None:
+            return self.fingerprint
+        return f"{self.fingerprint}|{json.dumps(fidelity, sort_keys=True)}"
+
+    def _remember(self, key, fitness):
+        self._memory[key] = fitness
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get(self, chromosome, fidelity=None):
+        """Returns the cached fitness of a clamped chromosome at a fidelity tier, or None."""
+        scenario, key = self._scenario(fidelity), self._key(chromosome)
+        self.lookups += 1
+
+        if (scenario, key) in self._memory:
+            self._memory.move_to_end((scenario, key))
+            self.hits += 1
+            return self._memory[(scenario, key)]
+        if (scenario, key) in self._pending:
+            self.hits += 1
+            return self._pending[(scenario, key)]
+
+        row = self._db.execute(
+            "SELECT fitness FROM fitness WHERE scenario = ? AND chromosome = ?",
+            (scenario, key)
+        ).fetchone()
+        if row is None:
+            return None
+
+        self._used[(scenario, key)] = time.time()
+        self._remember((scenario, key), row[0])
+        self.hits += 1
+        return row[0]
+
+    def put(self, chromosome, fitness, fidelity=None):
+        """
+        Stores the fitness of a clamped chromosome.
+        Failed simulations and censored (early-stopped) fitness values are not cached.
+        """
+        if fitness == float('inf') or getattr(fitness, 'censored', False):
+            return
+        scenario, key = self._scenario(fidelity), self._key(chromosome)
+        self._remember((scenario, key), float(fitness))
+        self._pending[(scenario, key)] = float(fitness)
+
+    def flush(self):
+        """Writes the buffered entries, evicts the oldest on-disk entries beyond the size bound and commits."""
+        now = time.time()
+        self._db.executemany(
+            "INSERT OR REPLACE INTO fitness VALUES (?, ?, ?, ?)",
+            [(scenario, key, fitness, now) for (scenario, key), fitness in self._pending.items()]
+        )
+        self._db.executemany(
+            "UPDATE fitness SET last_used = ? WHERE scenario = ? AND chromosome = ?",
+            [(used, scenario, key) for (scenario, key), used in self._used.items()]
+        )
+        self._pending.clear()
+        self._used.clear()
+        (count,) = self._db.execute("SELECT COUNT(*) FROM fitness").fetchone()
+        if count > self.disk_size:
+            self._db.execute(
+                "DELETE FROM fitness WHERE rowid IN "
+                "(SELECT rowid FROM fitness ORDER BY last_used LIMIT ?)",
+                (count - self.disk_size,)
+            )
+        self._db.commit()
+
+    def hit_rate(self):
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def close(self):
+        self.flush()
+        self._db.close()
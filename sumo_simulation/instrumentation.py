@@ -0,0 +1,199 @@
+# sumo_simulation/instrumentation.py
+
+import inspect
+import json
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from multiprocessing.util import Finalize
+from config import TRACE_FILE, PROFILER, PROFILE_DIR
+
+# Getters that only read the subscription results the client received with the last
+# step: no round trip to SUMO, so they are counted apart from the TraCI calls.
+LOCAL_CALLS = frozenset({
+    'getSubscriptionResults', 'getAllSubscriptionResults',
+    'getContextSubscriptionResults', 'getAllContextSubscriptionResults',
+})
+
+class EvaluationTrace:
+    """
+    Per-phase timers (seconds, time.perf_counter) and counters of one evaluation.
+    Phases are timed with `with trace.phase(name):`; repeated phases accumulate.
+    """
+
+    def __init__(self):
+        self.timers = {}
+        self.counters = {}
+        self.fields = {}
+        # TraCI call, local call and step counts, as one-element lists for cheap in-place increments.
+        self.traci_calls = [0]
+        self.local_calls = [0]
+        self.steps = [0]
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[name] = self.timers.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def wrap(self, conn):
+        """Returns `conn` wrapped in a CountingConnection that reports to this trace."""
+        return CountingConnection(conn, self)
+
+    def to_dict(self):
+        """Returns the trace as a JSON-serializable record."""
+        counters = dict(self.counters, traci_calls=self.traci_calls[0], local_calls=self.local_calls[0],
+                        steps=self.steps[0])
+        return dict(self.fields, total=time.perf_counter() - self._start,
+                    timers=self.timers, counters=counters)
+
+class _NullTrace:
+    """Stand-in for EvaluationTrace when instrumentation is off; every method is a no-op."""
+
+    @property
+    def fields(self):
+        # A fresh dict each time, so fields written by untraced evaluations go nowhere.
+        return {}
+
+    def phase(self, name):
+        return nullcontext()
+
+    def count(self, name, n=1):
+        pass
+
+    def wrap(self, conn):
+        return conn
+
+NULL_TRACE = _NullTrace()
+
+def _counting(method, name, trace):
+    """
+    Wraps a TraCI call so it is counted in the trace, as a local call if it is one of
+    LOCAL_CALLS; simulationStep is also timed as 'step'.
+    """
+    calls = trace.local_calls if name in LOCAL_CALLS else trace.traci_calls
+    if name != 'simulationStep':
+        def wrapper(*args, **kwargs):
+            calls[0] += 1
+            return method(*args, **kwargs)
+        return wrapper
+
+    steps, timers = trace.steps, trace.timers
+    def step_wrapper(*args, **kwargs):
+        calls[0] += 1
+        steps[0] += 1
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            timers['step'] = timers.get('step', 0.0) + time.perf_counter() - start
+    return step_wrapper
+
+class CountingConnection:
+    """
+    Wraps a TraCI connection (or the libsumo module) so every call, on the connection or
+    on one of its domains (simulation, vehicle, ...), is counted in the trace and
+    simulationStep is timed separately from the Python-side bookkeeping. Reads of the
+    client-side subscription results are counted as local calls.
+    Only functions and methods are counted: libsumo's domains are classes, which are
+    callable too, so classes and modules are wrapped as namespaces like domain objects.
+    """
+
+    def __init__(self, target, trace):
+        self._target = target
+        self._trace = trace
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if inspect.isroutine(attr):
+            wrapped = _counting(attr, name, self._trace)
+        elif name.startswith('_') or isinstance(attr, (int, float, str, bytes, tuple, list, dict)):
+            return attr
+        else:
+            wrapped = CountingConnection(attr, self._trace)
+        # Later lookups of the same attribute bypass __getattr__.
+        setattr(self, name, wrapped)
+        return wrapped
+
+def summarize(records):
+    """
+    Aggregates evaluation records: number of evaluations, summed timers and counters,
+    and the mean time per evaluation of every phase.
+    """
+    summary = {'evaluations': len(records), 'total': 0.0, 'timers': {}, 'counters': {}}
+    for record in records:
+        summary['total'] += record['total']
+        for name, value in record['timers'].items():
+            summary['timers'][name] = summary['timers'].get(name, 0.0) + value
+        for name, value in record['counters'].items():
+            summary['counters'][name] = summary['counters'].get(name, 0) + value
+    if records:
+        summary['mean_timers'] = {name: value / len(records) for name, value in summary['timers'].items()}
+    return summary
+
+class TraceWriter:
+    """Appends evaluation records and per-generation summaries to a JSONL trace file."""
+
+    def __init__(self, filename=TRACE_FILE):
+        self.filename = filename
+        self._file = open(filename, 'a')
+
+    def write_generation(self, generation, records, **fields):
+        """
+        Writes the records of a generation followed by their summary, and returns the summary.
+        Extra `fields` (e.g. island=2) are added to every line.
+        """
+        summary = summarize(records)
+        lines = [json.dumps(dict(record, type='evaluation', generation=generation, **fields)) for record in records]
+        lines.append(json.dumps(dict(summary, type='generation', generation=generation, time=time.time(), **fields)))
+        self._file.write("\n".join(lines) + "\n")
+        self._file.flush()
+        return summary
+
+    def close(self):
+        self._file.close()
+
+def start_profiler(label, kind=PROFILER):
+    """
+    Starts the optional profiler of the current process ('pyinstrument', a sampling
+    profiler, or 'cprofile'). Its report is written to PROFILE_DIR/<label>.txt or
+    PROFILE_DIR/<label>.prof when the process exits. Returns None if profiling is off.
+    """
+    if not kind:
+        return None
+    path = os.path.join(PROFILE_DIR, label)
+
+    if kind == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("WARNING: pyinstrument is not installed. Profiling is disabled.")
+            return None
+        profiler = Profiler()
+        profiler.start()
+        def write_report():
+            profiler.stop()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            with open(path + ".txt", 'w') as f:
+                f.write(profiler.output_text())
+    elif kind == 'cprofile':
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        def write_report():
+            profiler.disable()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            profiler.dump_stats(path + ".prof")
+    else:
+        print(f"WARNING: Unknown profiler '{kind}'. Profiling is disabled.")
+        return None
+
+    # Runs before the SUMO sessions are closed (exitpriority 10), see session.py.
+    Finalize(None, write_report, exitpriority=20)
+    return profiler
@@ -0,0 +1,350 @@
+# sumo_simulation/parallel_eval.py
+
+import asyncio
+import multiprocessing
+import os
+import signal
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+from config import NUM_WORKERS, SCREENING_TIER, TRACE_ENABLED, SUMOCFG_FILE, VEHICLE_COUNT
+from genetic_algorithm.ga_utilities import Fitness
+from .sumo_runner import evaluate_fitness, run_directory
+from .fitness_cache import clamp_chromosome
+from .session import get_session, close_sessions
+from .tls_program import TlsProgram
+from .instrumentation import EvaluationTrace, start_profiler
+
+# Per-process state of a pool worker, set once by _init_worker.
+_worker_id = 0
+_traffic_light_info = None
+_warmup = None
+_tls_program = None
+_sumocfg_file = SUMOCFG_FILE
+_vehicle_count = VEHICLE_COUNT
+
+def _set_worker_state(worker_id, traffic_light_info, warmup, tls_program, sumocfg_file, vehicle_count):
+    global _worker_id, _traffic_light_info, _warmup, _tls_program, _sumocfg_file, _vehicle_count
+    _worker_id = worker_id
+    _traffic_light_info = traffic_light_info
+    _warmup = warmup
+    _tls_program = tls_program
+    _sumocfg_file = sumocfg_file
+    _vehicle_count = vehicle_count
+    start_profiler(f"worker_{_worker_id}")
+
+def _init_worker(worker_ids, *scenario):
+    """Assigns a unique worker ID and the shared scenario data to a pool process."""
+    _set_worker_state(worker_ids.get(), *scenario)
+
+def _serve_worker(conn, worker_id, *scenario):
+    """
+    Main loop of a steady-state worker process (see _AsyncWorker): evaluates the tasks
+    received on `conn`, reporting when each one starts, until None is received.
+    """
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()  # Lets _AsyncWorker.kill() reach the SUMO processes started by this one.
+    _set_worker_state(worker_id, *scenario)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        conn.send(('started', None))
+        try:
+            conn.send(('done', _evaluate_in_worker(*task)))
+        except Exception:
+            conn.send(('error', traceback.format_exc()))
+
+def _evaluate_in_worker(chromosome, cutoff, fidelity, instrument, timeout=None):
+    trace = EvaluationTrace() if instrument else None
+    fitness = evaluate_fitness(chromosome, _traffic_light_info, worker_id=_worker_id, warmup=_warmup,
+                               tls_program=_tls_program, cutoff=cutoff, fidelity=fidelity, trace=trace,
+                               timeout=timeout, sumocfg_file=_sumocfg_file, vehicle_count=_vehicle_count)
+    record = _trace_record(trace, fitness) if instrument else None
+    return fitness, _worker_id, get_session(_worker_id).stats(), record
+
+def _trace_record(trace, fitness):
+    trace.fields.update(fitness=float(fitness), censored=getattr(fitness, 'censored', False))
+    return trace.to_dict()
+
+def _per_chromosome(cutoff, count):
+    """Returns a racing cutoff per chromosome, given one shared cutoff or a list of them."""
+    return list(cutoff) if isinstance(cutoff, (list, tuple)) else [cutoff] * count
+
+def _loosest(cutoff, other):
+    """Returns the cutoff that stops fewer simulations (None = no cutoff)."""
+    return None if cutoff is None or other is None else max(cutoff, other)
+
+class _AsyncWorker:
+    """
+    A dedicated worker process of the steady-state scheduler. Unlike a pool process, it
+    can be stopped in the middle of an evaluation (e.g. a hung SUMO instance): kill()
+    ends the process and the SUMO instances it started, and the next evaluation starts
+    a fresh process with the same worker ID.
+    """
+
+    def __init__(self, worker_id, scenario):
+        self.worker_id = worker_id
+        self.scenario = scenario
+        self.process = None
+        self.conn = None
+
+    def start(self):
+        if self.process is not None:
+            return
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_serve_worker, args=(child_conn, self.worker_id) + self.scenario,
+                                               name=f"worker_{self.worker_id}", daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def evaluate(self, task, on_start):
+        """Runs `task` in the worker process and returns its result; blocks, so it runs on a helper thread."""
+        conn = self.conn
+        conn.send(task)
+        conn.recv()
+        on_start()
+        kind, value = conn.recv()
+        if kind == 'error':
+            raise RuntimeError(f"Evaluation failed in worker {self.worker_id}:\n{value}")
+        return value
+
+    def kill(self):
+        if self.process is None:
+            return
+        if hasattr(os, 'killpg'):
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except OSError:
+                pass  # The worker has not created its process group yet.
+        self.process.kill()
+        self.process.join()
+        self.process = None
+
+    def stop(self):
+        """Lets an idle worker process exit (closing its SUMO sessions), and kills it if it does not."""
+        if self.process is None:
+            return
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=5)
+        self.kill()
+
+class ParallelEvaluator:
+    """
+    Evaluates whole populations, spreading the SUMO runs over a pool of worker processes.
+    With a single worker, individuals are evaluated sequentially in the current process;
+    evaluate_async() always uses dedicated worker processes, so it can kill hung ones.
+    If a FitnessCache is given, known chromosomes and duplicates are not simulated again.
+    If a warm-up snapshot is given, every evaluation starts from it.
+    With `instrument`, every simulation records an EvaluationTrace (see instrumentation.py),
+    collected until pop_trace_records() is called. `simulations` counts the SUMO runs.
+    Worker IDs start at `first_worker_id` (used by the current process, the pool workers
+    follow), so several evaluators in different processes never share a SUMO instance.
+    Simulations run the scenario configured by `sumocfg_file`, whose routes hold `vehicle_count` vehicles.
+    """
+
+    def __init__(self, traffic_light_info, num_workers=NUM_WORKERS, cache=None, warmup=None,
+                 instrument=TRACE_ENABLED, first_worker_id=0, sumocfg_file=SUMOCFG_FILE, vehicle_count=VEHICLE_COUNT):
+        self.traffic_light_info = traffic_light_info
+        self.warmup = warmup
+        self.sumocfg_file = sumocfg_file
+        self.vehicle_count = vehicle_count
+        self.tls_program = TlsProgram(traffic_light_info)
+        self.num_genes = len(self.tls_program.gene_index)
+        self.num_workers = max(1, num_workers)
+        self.cache = cache
+        self.first_worker_id = first_worker_id
+        self.simulations = 0
+        self._executor = None
+        self._async_workers = []
+        self._idle_workers = None
+        self._receivers = None
+        self._session_stats = {}
+        self.instrument = instrument
+        self._trace_records = []
+
+        if self.num_workers > 1:
+            run_directory()  # Fixes the run ID before the workers inherit the environment.
+            worker_ids = multiprocessing.Queue()
+            # The first worker ID is reserved for the current process (traffic light analysis).
+            for worker_id in range(first_worker_id + 1, first_worker_id + self.num_workers + 1):
+                worker_ids.put(worker_id)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.num_workers, initializer=_init_worker,
+                initargs=(worker_ids, traffic_light_info, warmup, self.tls_program, sumocfg_file, vehicle_count)
+            )
+
+    def evaluate(self, population, cutoff=None, fidelity=None):
+        """
+        Returns the fitness of every chromosome, in population order.
+        Simulations that provably cannot beat `cutoff` are stopped early (censored);
+        `cutoff` is shared by the population or a list with one cutoff per chromosome.
+        A `fidelity` tier evaluates with cheaper simulation settings (see evaluate_fitness).
+        """
+        cutoffs = _per_chromosome(cutoff, len(population))
+        if self.cache is None:
+            return self._simulate(population, cutoffs, fidelity)
+
+        keys = [clamp_chromosome(chrom, self.num_genes) for chrom in population]
+        known = {}
+        pending = {}
+        pending_cutoffs = {}
+        for key, chrom, chrom_cutoff in zip(keys, population, cutoffs):
+            if key in pending:
+                # Duplicates are simulated once, raced against the cutoff that suits all of them.
+                pending_cutoffs[key] = _loosest(pending_cutoffs[key], chrom_cutoff)
+                continue
+            if key in known:
+                continue
+            fitness = self.cache.get(key, fidelity)
+            if fitness is None:
+                pending[key] = chrom
+                pending_cutoffs[key] = chrom_cutoff
+            else:
+                known[key] = fitness if fidelity is None else Fitness(fitness, tier=fidelity['name'])
+
+        if pending:
+            simulated = self._simulate(list(pending.values()), list(pending_cutoffs.values()), fidelity)
+            for key, fitness in zip(pending, simulated):
+                self.cache.put(key, fitness, fidelity)
+                known[key] = fitness
+            self.cache.flush()
+
+        return [known[key] for key in keys]
+
+    def evaluate_multi_fidelity(self, population, top_k, cutoff=None, screening=SCREENING_TIER):
+        """
+        Screens the population with the cheap `screening` tier and re-evaluates only the
+        best `top_k` screened individuals at full fidelity, raced against `cutoff` (shared or
+        one per chromosome). Individuals whose full-fidelity fitness is already cached keep
+        it and are not screened.
+        Returns one fitness per chromosome, each tagged with its tier.
+        """
+        if top_k < 1:
+            # Without a full-fidelity value the generation has no statistics to compare.
+            raise ValueError(f"FULL_FIDELITY_TOP_K must be at least 1, got {top_k}.")
+        fitnesses = [None] * len(population)
+        if self.cache is not None:
+            for i, chrom in enumerate(population):
+                fitnesses[i] = self.cache.get(clamp_chromosome(chrom, self.num_genes))
+
+        unknown = [i for i, fitness in enumerate(fitnesses) if fitness is None]
+        screened = self.evaluate([population[i] for i in unknown], fidelity=screening)
+        for i, fitness in zip(unknown, screened):
+            fitnesses[i] = fitness
+
+        promoted = sorted(unknown, key=lambda i: fitnesses[i])[:top_k]
+        cutoffs = _per_chromosome(cutoff, len(population))
+        for i, fitness in zip(promoted, self.evaluate([population[i] for i in promoted], [cutoffs[i] for i in promoted])):
+            fitnesses[i] = fitness
+        return fitnesses
+
+    async def evaluate_async(self, chromosome, cutoff=None, timeout=None, on_start=None):
+        """
+        Evaluates one chromosome without blocking the event loop, for the steady-state
+        scheduler. Runs on one of `num_workers` dedicated worker processes, waiting for
+        a free one; `on_start(start)` is called with the time.monotonic() at which the
+        worker began the simulation. A `timeout` (seconds) stops the simulation early
+        with a censored lower bound. Cancelling the evaluation kills its worker process
+        (see _AsyncWorker), so a hung simulation never keeps the worker busy.
+        Must always be called from the same event loop, which is the only user of the cache.
+        """
+        key = clamp_chromosome(chromosome, self.num_genes)
+        if self.cache is not None:
+            fitness = self.cache.get(key)
+            if fitness is not None:
+                return fitness
+
+        if self._idle_workers is None:
+            run_directory()  # Fixes the run ID before the workers inherit the environment.
+            scenario = (self.traffic_light_info, self.warmup, self.tls_program, self.sumocfg_file, self.vehicle_count)
+            self._async_workers = [_AsyncWorker(worker_id, scenario) for worker_id in
+                                   range(self.first_worker_id + 1, self.first_worker_id + self.num_workers + 1)]
+            self._idle_workers = asyncio.Queue()
+            for worker in self._async_workers:
+                self._idle_workers.put_nowait(worker)
+            # Waits for the worker processes' replies, one thread per worker.
+            self._receivers = ThreadPoolExecutor(max_workers=self.num_workers)
+
+        worker = await self._idle_workers.get()
+        loop = asyncio.get_running_loop()
+        def started():
+            if on_start is not None:
+                loop.call_soon_threadsafe(on_start, time.monotonic())
+        try:
+            worker.start()
+            self.simulations += 1
+            task = (chromosome, cutoff, None, self.instrument, timeout)
+            fitness, worker_id, stats, record = await loop.run_in_executor(self._receivers, worker.evaluate, task, started)
+        except asyncio.CancelledError:
+            # The scheduler gave up on the evaluation: stop it, so the worker is really free again.
+            worker.kill()
+            raise
+        finally:
+            self._idle_workers.put_nowait(worker)
+
+        self._session_stats[worker_id] = stats
+        if record is not None:
+            self._trace_records.append(record)
+        if self.cache is not None:
+            self.cache.put(key, fitness)
+        return fitness
+
+    def _simulate(self, population, cutoffs, fidelity=None):
+        self.simulations += len(population)
+        if self._executor is None:
+            fitnesses = []
+            for chrom, cutoff in zip(population, cutoffs):
+                trace = EvaluationTrace() if self.instrument else None
+                fitness = evaluate_fitness(chrom, self.traffic_light_info, worker_id=self.first_worker_id,
+                                           warmup=self.warmup, tls_program=self.tls_program,
+                                           cutoff=cutoff, fidelity=fidelity, trace=trace,
+                                           sumocfg_file=self.sumocfg_file, vehicle_count=self.vehicle_count)
+                if self.instrument:
+                    self._trace_records.append(_trace_record(trace, fitness))
+                fitnesses.append(fitness)
+            self._session_stats[self.first_worker_id] = get_session(self.first_worker_id).stats()
+            return fitnesses
+
+        fitnesses = []
+        for fitness, worker_id, stats, record in self._executor.map(
+                _evaluate_in_worker, population, cutoffs, repeat(fidelity), repeat(self.instrument)):
+            self._session_stats[worker_id] = stats
+            if record is not None:
+                self._trace_records.append(record)
+            fitnesses.append(fitness)
+        return fitnesses
+
+    def pop_trace_records(self):
+        """Returns the trace records collected since the last call and forgets them."""
+        records, self._trace_records = self._trace_records, []
+        return records
+
+    def session_stats(self):
+        """Sums the SUMO startup and reset counts and timings over all workers."""
+        totals = {'startups': 0, 'startup_time': 0.0, 'resets': 0, 'reset_time': 0.0}
+        for stats in self._session_stats.values():
+            for key in totals:
+                totals[key] += stats[key]
+        return totals
+
+    def close(self):
+        for worker in self._async_workers:
+            worker.stop()
+        if self._receivers is not None:
+            self._receivers.shutdown(wait=True)
+            self._receivers = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        else:
+            close_sessions()
+        if self.cache is not None:
+            self.cache.close()
@@ -0,0 +1,112 @@
+# sumo_simulation/scenario_cache.py
+
+import filecmp
+import hashlib
+import json
+import os
+import shutil
+import sys
+from config import (
+    OSM_FILE, NET_FILE, TRIP_FILE, ROUTE_FILE, SCENARIO_CACHE_DIR, VEHICLE_COUNT,
+    SIMULATION_DURATION, SCENARIO_SEED, DEPARTURE_PROFILE
+)
+from .sumo_config_gen import NETCONVERT_OPTIONS, generate_network, generate_trips_and_routes, get_border_edges
+
+_file_digests = {}
+
+def file_digest(path):
+    """Returns the SHA-256 of a file's content, memoized per (path, size, mtime) within the process."""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _file_digests:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        _file_digests[key] = digest.hexdigest()
+    return _file_digests[key]
+
+def _inputs_key(*inputs):
+    return hashlib.sha256(json.dumps(inputs).encode()).hexdigest()[:16]
+
+def network_key():
+    """Key of the network: OSM content and netconvert options."""
+    return _inputs_key(file_digest(OSM_FILE), NETCONVERT_OPTIONS)
+
+def routes_key(net_key):
+    """Key of the routes: the network key plus everything the trip generation depends on."""
+    return _inputs_key(net_key, VEHICLE_COUNT, SIMULATION_DURATION, SCENARIO_SEED, DEPARTURE_PROFILE)
+
+def cached_json(path, compute):
+    """Returns the JSON content of `path`, computing it with `compute()` and writing it first if needed."""
+    if os.path.exists(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (IOError, ValueError) as e:
+            print(f"WARNING: Cached file '{path}' is unreadable and will be rebuilt. Error: {e}")
+
+    value = compute()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(value, f)
+    os.replace(tmp_path, path)
+    return value
+
+def net_metadata(net_file, name, compute):
+    """
+    Returns compute(net_file), cached as <name>.json in a directory named after the content
+    hash of the network file, so a given network is parsed only once.
+    """
+    metadata_dir = os.path.join(SCENARIO_CACHE_DIR, "meta-" + file_digest(net_file)[:16])
+    return cached_json(os.path.join(metadata_dir, name + ".json"), lambda: compute(net_file))
+
+def install_file(cached_file, path):
+    """Copies a cached artifact to its working location unless an identical copy is already there."""
+    if os.path.exists(path) and filecmp.cmp(cached_file, path, shallow=False):
+        return
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    shutil.copyfile(cached_file, tmp_path)
+    os.replace(tmp_path, path)
+
+def ensure_scenario():
+    """
+    Makes NET_FILE and ROUTE_FILE match the current scenario inputs.
+
+    Networks are stored under SCENARIO_CACHE_DIR/net-<key> and routes under
+    SCENARIO_CACHE_DIR/routes-<key>, where the keys hash the OSM content, the netconvert
+    options, VEHICLE_COUNT, SIMULATION_DURATION, SCENARIO_SEED and DEPARTURE_PROFILE.
+    netconvert and duarouter only run for inputs that have not been built before.
+    """
+    if not os.path.exists(OSM_FILE):
+        if os.path.exists(NET_FILE) and os.path.exists(ROUTE_FILE):
+            print(f"INFO: OSM file not found. Using EXISTING traffic scenario (.net.xml and .rou.xml files).")
+            return
+        print(f"CRITICAL – OSM file '{os.path.basename(OSM_FILE)}' not found.")
+        sys.exit(1)
+
+    net_key = network_key()
+    net_dir = os.path.join(SCENARIO_CACHE_DIR, "net-" + net_key)
+    cached_net = os.path.join(net_dir, os.path.basename(NET_FILE))
+    if os.path.exists(cached_net):
+        print(f"INFO: Using cached network '{net_key}'.")
+    else:
+        print(f"INFO: No network built for these inputs yet. Generating a NEW network...")
+        os.makedirs(net_dir, exist_ok=True)
+        generate_network(cached_net)
+
+    route_key = routes_key(net_key)
+    route_dir = os.path.join(SCENARIO_CACHE_DIR, "routes-" + route_key)
+    cached_route = os.path.join(route_dir, os.path.basename(ROUTE_FILE))
+    if os.path.exists(cached_route):
+        print(f"INFO: Using cached routes '{route_key}'.")
+    else:
+        print(f"INFO: No routes built for these inputs yet. Generating NEW trips and routes...")
+        os.makedirs(route_dir, exist_ok=True)
+        border_edges = net_metadata(cached_net, "border_edges", get_border_edges)
+        generate_trips_and_routes(cached_net, os.path.join(route_dir, os.path.basename(TRIP_FILE)),
+                                  cached_route, border_edges)
+
+    install_file(cached_net, NET_FILE)
+    install_file(cached_route, ROUTE_FILE)
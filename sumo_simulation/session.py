@@ -0,0 +1,82 @@
+# sumo_simulation/session.py
+
+import time
+from multiprocessing.util import Finalize
+from config import SESSION_MAX_EVALUATIONS
+from .backends import get_backend
+
+class SumoSession:
+    """
+    Keeps one SUMO instance alive for a worker and resets it between evaluations with
+    load() instead of launching a new instance for every individual. The instance is
+    recycled after `max_evaluations` evaluations, or when a reset fails.
+    """
+
+    def __init__(self, worker_id=0, max_evaluations=SESSION_MAX_EVALUATIONS):
+        self.worker_id = worker_id
+        self.max_evaluations = max(1, max_evaluations)
+        self.conn = None
+        self.evaluations = 0
+        self.startups = 0
+        self.startup_time = 0.0
+        self.resets = 0
+        self.reset_time = 0.0
+
+    def acquire(self, sumo_cmd):
+        """
+        Returns a connection to a simulation freshly loaded with `sumo_cmd`.
+        Raises the backend's errors if SUMO cannot be started.
+        """
+        backend = get_backend()
+        if self.conn is not None and self.evaluations >= self.max_evaluations:
+            self.close()
+
+        if self.conn is not None:
+            start = time.perf_counter()
+            try:
+                self.conn.load(sumo_cmd[1:])
+                self.resets += 1
+                self.reset_time += time.perf_counter() - start
+                self.evaluations += 1
+                return self.conn
+            except backend.errors as e:
+                print(f"WARNING: Could not reset SUMO session of worker {self.worker_id}, restarting it. {e}")
+                self.close()
+
+        start = time.perf_counter()
+        self.conn = backend.start(sumo_cmd, label=f"eval_{self.worker_id}")
+        self.startups += 1
+        self.startup_time += time.perf_counter() - start
+        self.evaluations = 1
+        return self.conn
+
+    def close(self):
+        if self.conn is None:
+            return
+        try:
+            self.conn.close()
+        except get_backend().errors:
+            pass
+        self.conn = None
+        self.evaluations = 0
+
+    def stats(self):
+        """Returns the number and total duration of startups and resets."""
+        return {
+            'startups': self.startups, 'startup_time': self.startup_time,
+            'resets': self.resets, 'reset_time': self.reset_time,
+        }
+
+# One session per worker ID and process, closed when the process exits.
+_sessions = {}
+
+def get_session(worker_id=0):
+    if worker_id not in _sessions:
+        _sessions[worker_id] = SumoSession(worker_id)
+    return _sessions[worker_id]
+
+def close_sessions():
+    for session in _sessions.values():
+        session.close()
+
+Finalize(None, close_sessions, exitpriority=10)
@@ -1,32 +1,51 @@
 # sumo_simulation/sumo_config_gen.py
 
+import math
 import os
 import subprocess
 import sys
 import random
-from xml.etree.ElementTree import Element, SubElement, ElementTree
-from sumolib import net
-from ..config import (
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from xml.etree.ElementTree import iterparse, tostring
+from xml.sax.saxutils import quoteattr
+from config import (
     NETCONVERT, DUAROUTER, OSM_FILE, NET_FILE, TRIP_FILE, ROUTE_FILE,
-    TYPE_FILE, SUMOCFG_FILE, SUMO_CONFIG_DIR, VEHICLE_COUNT, SIMULATION_DURATION
+    TYPE_FILE, SUMOCFG_FILE, SUMO_CONFIG_DIR, VEHICLE_COUNT, SIMULATION_DURATION, SCENARIO_SEED,
+    DEPARTURE_PROFILE, ROUTING_CHUNK_SIZE, ROUTING_PROCESSES
 )
 
-def generate_network():
+NETCONVERT_OPTIONS = [
+    "--tls.discard-loaded", "false", "--tls.guess", "--tls.default-type", "static",
+    "--junctions.join", "false", "--tls.guess.threshold", "2"
+]
+
+def _write_if_changed(path, content):
+    """Writes `content` to `path` unless the file already holds exactly that content."""
+    if os.path.exists(path):
+        with open(path) as f:
+            if f.read() == content:
+                return False
+    with open(path, "w") as f:
+        f.write(content)
+    return True
+
+def generate_network(net_file=NET_FILE):
     """Generates the SUMO network file from the OSM file."""
     if not os.path.exists(OSM_FILE):
         print(f"CRITICAL – OSM file '{os.path.basename(OSM_FILE)}' not found.")
         sys.exit(1)
 
     print(f"INFO – Generating network from {os.path.basename(OSM_FILE)}...")
+    tmp_file = net_file + ".part"
     try:
         command = [
             NETCONVERT, "--osm-files", os.path.basename(OSM_FILE),
-            "-o", os.path.basename(NET_FILE), "--tls.discard-loaded", "false",
-            "--tls.guess", "--tls.default-type", "static",
-            "--junctions.join", "false", "--tls.guess.threshold", "2"
-        ]
+            "-o", os.path.abspath(tmp_file)
+        ] + NETCONVERT_OPTIONS
         subprocess.run(command, check=True, capture_output=True, text=True, cwd=SUMO_CONFIG_DIR)
-        print(f"INFO – Network '{os.path.basename(NET_FILE)}' generated.")
+        os.replace(tmp_file, net_file)
+        print(f"INFO – Network '{os.path.basename(net_file)}' generated.")
     except subprocess.CalledProcessError as e:
         print(f"CRITICAL – netconvert error: {e.stderr}")
         sys.exit(1)
@@ -34,6 +53,7 @@ def generate_network():
 def get_border_edges(net_file):
     """Retrieves the incoming (entry) and outgoing (exit) edges of the network."""
     try:
+        from sumolib import net
         net_data = net.readNet(net_file)
         inputs = [e.getID() for e in net_data.getEdges() if not e.getIncoming()]
         outputs = [e.getID() for e in net_data.getEdges() if not e.getOutgoing()]
@@ -42,42 +62,176 @@ def get_border_edges(net_file):
         print(f"CRITICAL – Error reading network file '{net_file}': {e}")
         sys.exit(1)
 
-def generate_trips_and_routes():
-    """Generates random trip definitions and computes routes."""
-    inputs, outputs = get_border_edges(NET_FILE)
-    if not inputs or not outputs:
-        print("CRITICAL – No entry/exit edges found in the network.")
+def departure_times(count, duration=SIMULATION_DURATION, profile=DEPARTURE_PROFILE):
+    """
+    Yields `count` sorted departure times following a piecewise-constant demand profile
+    [(start_time, relative_rate), ...] (None = uniform). Vehicle i departs at the i/count
+    quantile of the profile, so the uniform profile gives i * duration / count.
+    """
+    if count <= 0:
+        return
+    breakpoints = sorted(profile) if profile else [(0, 1.0)]
+    segments = []
+    for k, (start, rate) in enumerate(breakpoints):
+        end = breakpoints[k + 1][0] if k + 1 < len(breakpoints) else duration
+        start, end = max(0, start), min(duration, end)
+        if end > start:
+            segments.append((start, end, max(0.0, rate)))
+    masses = [(end - start) * rate for start, end, rate in segments]
+    total = sum(masses)
+    if total <= 0:
+        print("CRITICAL – DEPARTURE_PROFILE has no demand within the simulation duration.")
         sys.exit(1)
 
-    root = Element("routes")
-    interval = SIMULATION_DURATION / VEHICLE_COUNT if VEHICLE_COUNT > 0 else 0
-    for i in range(VEHICLE_COUNT):
-        from_edge, to_edge = random.choice(inputs), random.choice(outputs)
-        while to_edge == from_edge and len(outputs) > 1:
-            to_edge = random.choice(outputs)
+    segment, mass_before = 0, 0.0
+    for i in range(count):
+        target = total * i / count
+        while segment < len(segments) - 1 and mass_before + masses[segment] <= target:
+            mass_before += masses[segment]
+            segment += 1
+        start, _, rate = segments[segment]
+        yield start + (target - mass_before) / rate if rate > 0 else start
 
-        depart_time = min(SIMULATION_DURATION, i * interval)
-        SubElement(root, "trip", {"id": f"trip_{i}", "from": from_edge, "to": to_edge, "depart": f"{depart_time:.2f}"})
+def iter_trips(inputs, outputs, count=VEHICLE_COUNT, seed=SCENARIO_SEED):
+    """
+    Yields (trip_id, from_edge, to_edge, depart_time) in departure order, with edges drawn
+    uniformly from the border edges; `to_edge` is never `from_edge` if another exit exists.
+    """
+    rng = random.Random(seed)
+    output_index = {edge: i for i, edge in enumerate(outputs)}
+    for i, depart_time in enumerate(departure_times(count)):
+        from_edge = rng.choice(inputs)
+        excluded = output_index.get(from_edge) if len(outputs) > 1 else None
+        if excluded is None:
+            to_edge = rng.choice(outputs)
+        else:
+            # Draw among the other exits directly instead of rejecting from_edge.
+            j = rng.randrange(len(outputs) - 1)
+            to_edge = outputs[j + 1 if j >= excluded else j]
+        yield f"trip_{i}", from_edge, to_edge, depart_time
 
-    ElementTree(root).write(TRIP_FILE, encoding="utf-8", xml_declaration=True)
-    print(f"INFO – Trip file '{os.path.basename(TRIP_FILE)}' generated.")
+def write_trip_file(path, trips):
+    """Streams trips to a trip file, one line at a time."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="utf-8"?>\n<routes>\n')
+        for trip_id, from_edge, to_edge, depart_time in trips:
+            f.write(f'    <trip id={quoteattr(trip_id)} from={quoteattr(from_edge)} '
+                    f'to={quoteattr(to_edge)} depart="{depart_time:.2f}"/>\n')
+        f.write('</routes>\n')
 
+def run_duarouter(net_file, trip_file, route_file):
+    """Computes the routes of a trip file."""
+    tmp_file = route_file + ".part"
     try:
         subprocess.run(
-            [DUAROUTER, "--net-file", os.path.basename(NET_FILE), "-t", os.path.basename(TRIP_FILE), "-o", os.path.basename(ROUTE_FILE)],
+            [DUAROUTER, "--net-file", os.path.abspath(net_file), "-t", os.path.abspath(trip_file), "-o", os.path.abspath(tmp_file)],
             check=True, capture_output=True, text=True, cwd=SUMO_CONFIG_DIR
         )
-        print(f"INFO – Route file '{os.path.basename(ROUTE_FILE)}' generated.")
+        os.replace(tmp_file, route_file)
     except subprocess.CalledProcessError as e:
         print(f"CRITICAL – duarouter error: {e.stderr}")
         sys.exit(1)
 
+def merge_route_files(route_files, route_file):
+    """
+    Concatenates route files whose departures follow each other, streaming element by
+    element. Top-level elements other than vehicles (e.g. vTypes) are written only once.
+    """
+    tmp_file = route_file + ".part"
+    written = set()
+    with open(tmp_file, "wb") as out:
+        out.write(b'<?xml version="1.0" encoding="UTF-8"?>\n<routes>\n')
+        for path in route_files:
+            depth, root = 0, None
+            for event, elem in iterparse(path, events=("start", "end")):
+                if event == "start":
+                    if root is None:
+                        root = elem
+                    depth += 1
+                    continue
+                depth -= 1
+                if depth != 1:
+                    continue
+                key = (elem.tag, elem.get("id"))
+                if elem.tag == "vehicle" or key not in written:
+                    written.add(key)
+                    elem.tail = "\n"
+                    out.write(b"    " + tostring(elem))
+                root.clear()
+        out.write(b'</routes>\n')
+    os.replace(tmp_file, route_file)
+
+def generate_trips_and_routes(net_file=NET_FILE, trip_file=TRIP_FILE, route_file=ROUTE_FILE, border_edges=None):
+    """
+    Generates random trip definitions (seeded with SCENARIO_SEED) and computes routes.
+    `border_edges` may hold the (inputs, outputs) of the network if they are already known.
+
+    Trips are streamed to disk. Trip sets larger than ROUTING_CHUNK_SIZE are split into
+    chunk files that are routed by up to ROUTING_PROCESSES duarouter processes at once
+    and merged into the route file.
+    """
+    inputs, outputs = border_edges if border_edges is not None else get_border_edges(net_file)
+    if not inputs or not outputs:
+        print("CRITICAL – No entry/exit edges found in the network.")
+        sys.exit(1)
+
+    trips = iter_trips(inputs, outputs)
+    num_chunks = max(1, math.ceil(VEHICLE_COUNT / ROUTING_CHUNK_SIZE))
+    if num_chunks == 1:
+        write_trip_file(trip_file, trips)
+        print(f"INFO – Trip file '{os.path.basename(trip_file)}' generated.")
+        run_duarouter(net_file, trip_file, route_file)
+        print(f"INFO – Route file '{os.path.basename(route_file)}' generated.")
+        return
+
+    trip_base = trip_file[:-len(".xml")] if trip_file.endswith(".xml") else trip_file
+    chunk_trip_files = [f"{trip_base}.{k:03d}.xml" for k in range(num_chunks)]
+    chunk_route_files = [f"{route_file}.{k:03d}" for k in range(num_chunks)]
+    for chunk_trip_file in chunk_trip_files:
+        write_trip_file(chunk_trip_file, islice(trips, ROUTING_CHUNK_SIZE))
+    print(f"INFO – {VEHICLE_COUNT} trips generated in {num_chunks} chunk files.")
+
+    with ThreadPoolExecutor(max_workers=ROUTING_PROCESSES) as pool:
+        list(pool.map(run_duarouter, [net_file] * num_chunks, chunk_trip_files, chunk_route_files))
+    merge_route_files(chunk_route_files, route_file)
+    for path in chunk_route_files:
+        os.remove(path)
+    print(f"INFO – Route file '{os.path.basename(route_file)}' generated from {num_chunks} duarouter runs.")
+
+def count_vehicles(route_file):
+    """
+    Returns the number of vehicles defined by a route file: one per <vehicle> or <trip>,
+    plus the `number` of every <flow> (flows defined by a period or probability count as
+    none, with a warning).
+    """
+    count = 0
+    depth = 0
+    for event, elem in iterparse(route_file, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            continue
+        depth -= 1
+        if depth != 1:
+            continue
+        if elem.tag in ("vehicle", "trip"):
+            count += 1
+        elif elem.tag == "flow":
+            if elem.get("number") is None:
+                print(f"WARNING: Flow '{elem.get('id')}' in '{os.path.basename(route_file)}' has no vehicle number and is not counted.")
+            else:
+                count += int(elem.get("number"))
+        elem.clear()
+    return count
+
 def create_type_file():
-    """Creates a basic vehicle types file."""
-    with open(TYPE_FILE, "w") as f:
-        f.write('<routes><vType id="car" accel="2.6" decel="4.5" sigma="0.5" length="5" maxSpeed="30"/></routes>')
-
-def create_sumocfg():
-    """Creates the main SUMO configuration file (.sumocfg)."""
-    with open(SUMOCFG_FILE, "w") as fd:
-        fd.write(f'<configuration><input><net-file value="{os.path.basename(NET_FILE)}"/><route-files value="{os.path.basename(ROUTE_FILE)}"/><additional-files value="{os.path.basename(TYPE_FILE)}"/></input><time><begin value="0"/><end value="{SIMULATION_DURATION}"/></time></configuration>')
+    """Creates a basic vehicle types file, left untouched if its content is unchanged."""
+    _write_if_changed(TYPE_FILE, '<routes><vType id="car" accel="2.6" decel="4.5" sigma="0.5" length="5" maxSpeed="30"/></routes>')
+
+def create_sumocfg(sumocfg_file=SUMOCFG_FILE, route_file=ROUTE_FILE):
+    """
+    Creates a SUMO configuration file (.sumocfg) for the network and `route_file`, left
+    untouched if its content is unchanged. Paths are written relative to the file itself.
+    """
+    def relative(path):
+        return os.path.relpath(path, os.path.dirname(os.path.abspath(sumocfg_file)))
+    _write_if_changed(sumocfg_file, f'<configuration><input><net-file value="{relative(NET_FILE)}"/><route-files value="{relative(route_file)}"/><additional-files value="{relative(TYPE_FILE)}"/></input><time><begin value="0"/><end value="{SIMULATION_DURATION}"/></time></configuration>')
@@ -1,112 +1,322 @@
 # sumo_simulation/sumo_runner.py
 
+import collections
 import os
+import shutil
 import sys
-import random
-import traci
-from ..config import (
-    SUMO_BINARY, SUMOCFG_FILE, STEP_LENGTH, SIM_STEPS, MIN_PHASE_DURATION, MAX_PHASE_DURATION, SUMO_CONFIG_DIR
+import time
+from config import (
+    SUMO_BINARY, SUMOCFG_FILE, TYPE_FILE, STEP_LENGTH, SIM_STEPS, SIMULATION_DURATION, WORKER_DIR, METRIC_COLLECTION,
+    TLS_PROGRAM_MODE, RACING_CHECK_INTERVAL, VEHICLE_COUNT, NET_FILE
 )
-from ..genetic_algorithm.ga_utilities import calculate_fitness
+from genetic_algorithm.ga_utilities import calculate_fitness, fitness_lower_bound, Fitness
+from .backends import get_backend
+from .session import get_session
+from .tls_program import TlsProgram
+from .scenario_cache import net_metadata
+from .instrumentation import NULL_TRACE
 
-def get_traffic_light_info():
+# Set by the first process of a run and inherited by its worker and island processes.
+RUN_ID_VARIABLE = "TLO_RUN_ID"
+
+def run_directory():
     """
-    Launches a short SUMO simulation to retrieve traffic light IDs and their green phase indices.
+    Returns the directory holding the worker directories of the current run,
+    WORKER_DIR/run_<process ID of the run's main process>, so that concurrent runs on
+    the same host never overwrite each other's program files and logs.
     """
-    original_cwd = os.getcwd()
-    os.chdir(SUMO_CONFIG_DIR)
+    run_id = os.environ.setdefault(RUN_ID_VARIABLE, str(os.getpid()))
+    return os.path.abspath(os.path.join(WORKER_DIR, f"run_{run_id}"))
 
-    sumo_cmd = [SUMO_BINARY, "-c", os.path.basename(SUMOCFG_FILE), "--start", "--quit-on-end"]
-    traci_port = 8813 + random.randint(0, 1000)
+def remove_run_directory():
+    """Deletes the worker directories of the current run, once it is over."""
+    shutil.rmtree(run_directory(), ignore_errors=True)
+
+def worker_directory(worker_id):
+    """
+    Returns (and creates if needed) the private working directory of a worker.
+    """
+    path = os.path.join(run_directory(), f"worker_{worker_id}")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def build_sumo_command(workdir, step_length=STEP_LENGTH, mesosim=False, sumocfg_file=SUMOCFG_FILE):
+    """
+    Returns the SUMO command line used for evaluations of the scenario configured by
+    `sumocfg_file`, logging errors into `workdir`.
+    """
+    sumo_cmd = [SUMO_BINARY, "-c", os.path.abspath(sumocfg_file), "--start", "--quit-on-end",
+                "--step-length", str(step_length), "--no-warnings",
+                "--error-log", os.path.join(workdir, "sumo_error.log")]
+    if mesosim:
+        sumo_cmd.append("--mesosim")
+    return sumo_cmd
+
+# Phase of a traffic light program as read back from the metadata cache.
+CachedPhase = collections.namedtuple('CachedPhase', 'duration state minDur maxDur next name')
+
+def read_traffic_lights(worker_id=0):
+    """
+    Launches a short SUMO simulation to retrieve traffic light IDs, their green phase indices
+    and their phases, as JSON-serializable values.
+    """
+    sumo_cmd = [SUMO_BINARY, "-c", os.path.abspath(SUMOCFG_FILE), "--start", "--quit-on-end"]
+    backend = get_backend()
 
     try:
-        traci.start(sumo_cmd, port=traci_port, label=f"init_tls_check_{traci_port}")
-    except traci.exceptions.FatalTraCIError as e:
-        print(f"CRITICAL – Could not start SUMO/TraCI for traffic light initialization. Error: {e}")
-        os.chdir(original_cwd)
+        conn = backend.start(sumo_cmd, label=f"init_tls_check_{worker_id}")
+    except backend.errors as e:
+        print(f"CRITICAL – Could not start SUMO ({backend.name}) for traffic light initialization. Error: {e}")
         sys.exit(1)
 
     traffic_lights = {}
-    tls_ids = traci.trafficlight.getIDList()
+    tls_ids = conn.trafficlight.getIDList()
 
     for tls_id in tls_ids:
-        logic = traci.trafficlight.getCompleteRedYellowGreenDefinition(tls_id)[0]
+        logic = conn.trafficlight.getCompleteRedYellowGreenDefinition(tls_id)[0]
         green_phases_indices = [i for i, phase in enumerate(logic.phases) if 'g' in phase.state.lower()]
-        traffic_lights[tls_id] = {'green_phases': green_phases_indices, 'all_phases': logic.phases}
+        phases = [[phase.duration, phase.state, phase.minDur, phase.maxDur,
+                   list(getattr(phase, 'next', ())), getattr(phase, 'name', '')] for phase in logic.phases]
+        traffic_lights[tls_id] = {'green_phases': green_phases_indices, 'all_phases': phases}
 
-    traci.close()
-    os.chdir(original_cwd)
+    conn.close()
     return traffic_lights
 
-def evaluate_fitness(chromosome, traffic_light_info):
+def get_traffic_light_info(worker_id=0, net_file=NET_FILE):
     """
-    Runs a SUMO simulation with a given chromosome and returns the fitness.
+    Returns {tls_id: {'green_phases': [...], 'all_phases': [...]}} for the network.
+    SUMO is only launched the first time a network is seen; the result is cached under
+    the content hash of `net_file`.
     """
-    original_cwd = os.getcwd()
-    os.chdir(SUMO_CONFIG_DIR)
-
-    sumo_cmd = [SUMO_BINARY, "-c", os.path.basename(SUMOCFG_FILE), "--start", "--quit-on-end",
-                "--step-length", str(STEP_LENGTH), "--no-warnings",
-                "--error-log", os.path.join(original_cwd, SUMO_CONFIG_DIR, "sumo_error.log")]
-
-    traci_port = 8813 + random.randint(0, 1000)
+    traffic_lights = net_metadata(net_file, "traffic_lights", lambda _: read_traffic_lights(worker_id))
+    for info in traffic_lights.values():
+        info['all_phases'] = [CachedPhase(duration, state, min_dur, max_dur, tuple(next_phases), name)
+                              for duration, state, min_dur, max_dur, next_phases, name in info['all_phases']]
+    return traffic_lights
 
-    try:
-        traci.start(sumo_cmd, port=traci_port, label=f"eval_{random.randint(1,10000)}")
-    except traci.TraCIException as e:
-        print(f"CRITICAL – Could not start SUMO/TraCI for evaluation. Error: {e}")
-        os.chdir(original_cwd)
-        return float('inf')
-
-    gene_index = 0
-    for tls_id, info in traffic_light_info.items():
-        logic = traci.trafficlight.getCompleteRedYellowGreenDefinition(tls_id)[0]
-        for phase_index in info['green_phases']:
-            if gene_index < len(chromosome):
-                duration = max(MIN_PHASE_DURATION, min(MAX_PHASE_DURATION, chromosome[gene_index]))
-                logic.phases[phase_index].duration = duration
-                gene_index += 1
-            else:
-                break
-        traci.trafficlight.setCompleteRedYellowGreenDefinition(tls_id, logic)
+def collect_metrics_polling(conn, max_steps, active_vehicle_data=None, stop_check=None):
+    """
+    Steps the simulation and polls every live vehicle's waiting time at each step.
+    Returns the durations and waiting times of the completed trips.
 
+    `active_vehicle_data` holds the vehicles already on the road (e.g. after loading a
+    warm-up state); it is updated in place and keeps the unfinished trips at the end.
+    `stop_check(sim_time, durations, waiting_times, active_vehicle_data)` is called every
+    RACING_CHECK_INTERVAL steps and ends the run early when it returns True.
+    """
+    errors = get_backend().errors
     completed_trip_durations = []
     completed_trip_waiting_times = []
-    active_vehicle_data = {}
+    if active_vehicle_data is None:
+        active_vehicle_data = {}
 
     step = 0
-    while step < SIM_STEPS:
+    while step < max_steps:
         try:
-            traci.simulationStep()
-        except traci.TraCIException as e:
+            conn.simulationStep()
+        except errors as e:
             print(f"WARNING: Error during simulation (step {step}). {e}")
             break
 
-        sim_time = traci.simulation.getTime()
+        sim_time = conn.simulation.getTime()
 
-        for veh_id in traci.simulation.getDepartedIDList():
+        for veh_id in conn.simulation.getDepartedIDList():
             active_vehicle_data[veh_id] = {'depart_time': sim_time, 'accumulated_waiting_time': 0}
 
-        for veh_id in traci.vehicle.getIDList():
+        for veh_id in conn.vehicle.getIDList():
             if veh_id in active_vehicle_data:
                 try:
-                    active_vehicle_data[veh_id]['accumulated_waiting_time'] = traci.vehicle.getAccumulatedWaitingTime(veh_id)
-                except traci.TraCIException:
+                    active_vehicle_data[veh_id]['accumulated_waiting_time'] = conn.vehicle.getAccumulatedWaitingTime(veh_id)
+                except errors:
                     pass
 
-        for veh_id in traci.simulation.getArrivedIDList():
+        for veh_id in conn.simulation.getArrivedIDList():
             if veh_id in active_vehicle_data:
                 data = active_vehicle_data.pop(veh_id)
                 duration = sim_time - data['depart_time']
                 completed_trip_durations.append(duration)
                 completed_trip_waiting_times.append(data['accumulated_waiting_time'])
 
-        if traci.simulation.getMinExpectedNumber() == 0 and not traci.vehicle.getIDList():
+        if conn.simulation.getMinExpectedNumber() == 0 and not conn.vehicle.getIDList():
              break
 
+        if (stop_check is not None and step % RACING_CHECK_INTERVAL == 0 and
+                stop_check(sim_time, completed_trip_durations, completed_trip_waiting_times, active_vehicle_data)):
+            break
+
+        step += 1
+
+    return completed_trip_durations, completed_trip_waiting_times
+
+def collect_metrics_subscription(conn, max_steps, active_vehicle_data=None, stop_check=None):
+    """
+    Same metrics as collect_metrics_polling, gathered through TraCI subscriptions:
+    the values of all subscribed variables come back with each simulation step
+    instead of costing one round trip per vehicle.
+    """
+    import traci.constants as tc
+    errors = get_backend().errors
+    completed_trip_durations = []
+    completed_trip_waiting_times = []
+    if active_vehicle_data is None:
+        active_vehicle_data = {}
+
+    conn.simulation.subscribe([
+        tc.VAR_TIME, tc.VAR_DEPARTED_VEHICLES_IDS, tc.VAR_ARRIVED_VEHICLES_IDS, tc.VAR_MIN_EXPECTED_VEHICLES
+    ])
+    for veh_id in active_vehicle_data:
+        conn.vehicle.subscribe(veh_id, [tc.VAR_ACCUMULATED_WAITING_TIME])
+
+    step = 0
+    while step < max_steps:
+        try:
+            conn.simulationStep()
+        except errors as e:
+            print(f"WARNING: Error during simulation (step {step}). {e}")
+            break
+
+        sim_results = conn.simulation.getSubscriptionResults()
+        sim_time = sim_results[tc.VAR_TIME]
+
+        for veh_id in sim_results[tc.VAR_DEPARTED_VEHICLES_IDS]:
+            active_vehicle_data[veh_id] = {'depart_time': sim_time, 'accumulated_waiting_time': 0}
+            conn.vehicle.subscribe(veh_id, [tc.VAR_ACCUMULATED_WAITING_TIME])
+
+        vehicle_results = conn.vehicle.getAllSubscriptionResults()
+        for veh_id, values in vehicle_results.items():
+            if veh_id in active_vehicle_data:
+                active_vehicle_data[veh_id]['accumulated_waiting_time'] = values[tc.VAR_ACCUMULATED_WAITING_TIME]
+
+        for veh_id in sim_results[tc.VAR_ARRIVED_VEHICLES_IDS]:
+            if veh_id in active_vehicle_data:
+                data = active_vehicle_data.pop(veh_id)
+                duration = sim_time - data['depart_time']
+                completed_trip_durations.append(duration)
+                completed_trip_waiting_times.append(data['accumulated_waiting_time'])
+
+        if sim_results[tc.VAR_MIN_EXPECTED_VEHICLES] == 0 and not vehicle_results:
+            break
+
+        if (stop_check is not None and step % RACING_CHECK_INTERVAL == 0 and
+                stop_check(sim_time, completed_trip_durations, completed_trip_waiting_times, active_vehicle_data)):
+            break
+
         step += 1
 
-    traci.close()
-    os.chdir(original_cwd)
-    
-    return calculate_fitness(completed_trip_durations, completed_trip_waiting_times)
+    return completed_trip_durations, completed_trip_waiting_times
+
+METRIC_COLLECTORS = {
+    'polling': collect_metrics_polling,
+    'subscription': collect_metrics_subscription,
+}
+
+def evaluate_fitness(chromosome, traffic_light_info, worker_id=0, metric_collection=METRIC_COLLECTION,
+                     warmup=None, tls_program=None, tls_program_mode=TLS_PROGRAM_MODE, cutoff=None,
+                     fidelity=None, trace=None, timeout=None, sumocfg_file=SUMOCFG_FILE, vehicle_count=VEHICLE_COUNT):
+    """
+    Runs a SUMO simulation with a given chromosome and returns the fitness.
+
+    Each worker uses its own working directory and long-lived SUMO session (see
+    session.py), so several evaluations can run concurrently in separate processes.
+    `metric_collection` selects one of METRIC_COLLECTORS to gather trip durations
+    and waiting times. If a `warmup` snapshot (see warmup.py) is given, the run starts
+    from its saved state and its trips are carried over into the fitness.
+
+    With `tls_program_mode` 'additional' the chromosome is compiled into a <tlLogic>
+    file loaded by SUMO at startup; with 'traci' every traffic light is reprogrammed
+    through TraCI. Pass a prebuilt TlsProgram to avoid re-reading the network.
+    `sumocfg_file` selects the scenario (e.g. the routes of a service demand window) and
+    `vehicle_count` is the number of vehicles in its routes, which normalizes the fitness.
+
+    If a `cutoff` is given, the run stops as soon as a lower bound on its final fitness
+    exceeds it, and the bound is returned as a censored Fitness. A `timeout` (wall-clock
+    seconds) stops a straggling run the same way once it has been simulating too long.
+
+    A `fidelity` tier (e.g. SCREENING_TIER from config.py) replaces the step length and
+    horizon, optionally with the mesoscopic model; its result is a Fitness tagged with the
+    tier name. Warm-up snapshots only apply to the full-fidelity tier.
+
+    If an EvaluationTrace is given, it receives the time spent in each phase ('program',
+    'session', 'warmup', 'simulation' with 'step' inside it, 'fitness') and the number of
+    steps, TraCI calls and vehicles tracked.
+    """
+    if trace is None:
+        trace = NULL_TRACE
+    workdir = worker_directory(worker_id)
+    step_length, simulation_duration, sim_steps, tier = STEP_LENGTH, SIMULATION_DURATION, SIM_STEPS, 'full'
+    if fidelity is not None:
+        step_length, simulation_duration = fidelity['step_length'], fidelity['duration']
+        sim_steps, tier = int(simulation_duration / step_length), fidelity['name']
+        warmup = None
+    sumo_cmd = build_sumo_command(workdir, step_length, fidelity is not None and fidelity.get('mesosim', False),
+                                  sumocfg_file)
+    if tls_program is None:
+        tls_program = TlsProgram(traffic_light_info)
+    if tls_program_mode == 'additional':
+        program_file = os.path.join(workdir, "ga_tls.add.xml")
+        with trace.phase('program'):
+            tls_program.write_additional(chromosome, program_file)
+        sumo_cmd += ["--additional-files", f"{os.path.abspath(TYPE_FILE)},{program_file}"]
+    backend = get_backend()
+    session = get_session(worker_id)
+    trace.fields.update(worker=worker_id, tier=tier)
+
+    try:
+        with trace.phase('session'):
+            conn = trace.wrap(session.acquire(sumo_cmd))
+    except backend.errors as e:
+        print(f"CRITICAL – Could not start SUMO ({backend.name}) for evaluation. Error: {e}")
+        session.close()
+        return Fitness(float('inf'), tier=tier)
+
+    if warmup is not None:
+        with trace.phase('warmup'):
+            conn.simulation.loadState(warmup['state_file'])
+
+    with trace.phase('program'):
+        if tls_program_mode == 'additional':
+            if warmup is not None:
+                tls_program.activate(conn)
+        else:
+            tls_program.apply_traci(conn, chromosome)
+
+    collect_metrics = METRIC_COLLECTORS[metric_collection]
+    prior_durations, prior_waiting_times, active_vehicle_data, max_steps = [], [], {}, sim_steps
+    if warmup is not None:
+        prior_durations, prior_waiting_times = warmup['durations'], warmup['waiting_times']
+        active_vehicle_data = {veh_id: dict(data) for veh_id, data in warmup['active_vehicles'].items()}
+        max_steps = sim_steps - warmup['steps']
+
+    censored = []
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    def should_stop(sim_time, durations, waiting_times, active_vehicles):
+        timed_out = deadline is not None and time.monotonic() > deadline
+        if cutoff is None and not timed_out:
+            return False
+        bound = fitness_lower_bound(
+            prior_durations + durations, prior_waiting_times + waiting_times,
+            [sim_time - data['depart_time'] for data in active_vehicles.values()], vehicle_count
+        )
+        if timed_out or bound > cutoff:
+            censored.append((sim_time, bound))
+            if timed_out:
+                trace.count('timeouts')
+            return True
+        return False
+
+    stop_check = should_stop if cutoff is not None or deadline is not None else None
+    with trace.phase('simulation'):
+        durations, waiting_times = collect_metrics(conn, max_steps, active_vehicle_data, stop_check)
+    trace.count('vehicles', len(durations) + len(active_vehicle_data))
+    if censored:
+        sim_time, bound = censored[0]
+        steps_saved = max(0, sim_steps - int(round(sim_time / step_length)))
+        return Fitness(bound, censored=True, steps_saved=steps_saved, tier=tier)
+
+    completed_trip_durations = prior_durations + durations
+    completed_trip_waiting_times = prior_waiting_times + waiting_times
+
+    with trace.phase('fitness'):
+        fitness = calculate_fitness(completed_trip_durations, completed_trip_waiting_times, simulation_duration,
+                                    vehicle_count)
+    return fitness if fidelity is None else Fitness(fitness, tier=tier)
@@ -0,0 +1,90 @@
+# sumo_simulation/tls_program.py
+
+import os
+from xml.etree.ElementTree import iterparse
+from xml.sax.saxutils import quoteattr
+from config import NET_FILE, MIN_PHASE_DURATION, MAX_PHASE_DURATION
+from .scenario_cache import net_metadata
+
+GA_PROGRAM_ID = "ga"
+
+def build_gene_index(traffic_light_info):
+    """
+    Maps every gene, in chromosome order, to the (tls_id, phase_index) it controls.
+    """
+    return [(tls_id, phase_index)
+            for tls_id, info in traffic_light_info.items()
+            for phase_index in info['green_phases']]
+
+def read_tls_metadata(net_file=NET_FILE):
+    """
+    Reads the type, program ID and offset of every traffic light program in the network file.
+    """
+    metadata = {}
+    for _, elem in iterparse(net_file):
+        if elem.tag == 'tlLogic':
+            metadata[elem.get('id')] = {
+                'type': elem.get('type', 'static'),
+                'program_id': elem.get('programID', '0'),
+                'offset': elem.get('offset', '0'),
+            }
+        if elem.tag in ('tlLogic', 'edge', 'junction', 'connection'):
+            elem.clear()
+    return metadata
+
+class TlsProgram:
+    """
+    Turns chromosomes into traffic light programs, either as a <tlLogic> additional file
+    loaded by SUMO at startup or by reprogramming each traffic light through TraCI.
+    The gene index and program templates are built once per scenario, and the parsed
+    network metadata is cached next to the other scenario artifacts.
+    """
+
+    def __init__(self, traffic_light_info, net_file=NET_FILE):
+        self.traffic_light_info = traffic_light_info
+        self.gene_index = build_gene_index(traffic_light_info)
+        self.metadata = net_metadata(net_file, "tls_metadata", read_tls_metadata)
+
+    def phase_durations(self, chromosome):
+        """Returns {tls_id: {phase_index: duration}} for the (clamped) genes of the chromosome."""
+        durations = {tls_id: {} for tls_id in self.traffic_light_info}
+        for (tls_id, phase_index), gene in zip(self.gene_index, chromosome):
+            durations[tls_id][phase_index] = max(MIN_PHASE_DURATION, min(MAX_PHASE_DURATION, gene))
+        return durations
+
+    def write_additional(self, chromosome, path):
+        """Writes the chromosome as one <tlLogic> program per traffic light (programID 'ga')."""
+        lines = ['<additional>']
+        for tls_id, overrides in self.phase_durations(chromosome).items():
+            meta = self.metadata.get(tls_id, {'type': 'static', 'offset': '0'})
+            lines.append(f'    <tlLogic id={quoteattr(tls_id)} type="{meta["type"]}" '
+                         f'programID="{GA_PROGRAM_ID}" offset="{meta["offset"]}">')
+            for phase_index, phase in enumerate(self.traffic_light_info[tls_id]['all_phases']):
+                attrs = f'duration="{overrides.get(phase_index, phase.duration)}" state="{phase.state}"'
+                if meta['type'] != 'static':
+                    attrs += f' minDur="{phase.minDur}" maxDur="{phase.maxDur}"'
+                if getattr(phase, 'next', ()):
+                    attrs += f' next="{" ".join(map(str, phase.next))}"'
+                if getattr(phase, 'name', ''):
+                    attrs += f' name={quoteattr(phase.name)}'
+                lines.append(f'        <phase {attrs}/>')
+            lines.append('    </tlLogic>')
+        lines.append('</additional>\n')
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            f.write("\n".join(lines))
+        os.replace(tmp_path, path)
+
+    def apply_traci(self, conn, chromosome):
+        """Reprograms every traffic light of a running simulation through TraCI."""
+        for tls_id, overrides in self.phase_durations(chromosome).items():
+            logic = conn.trafficlight.getCompleteRedYellowGreenDefinition(tls_id)[0]
+            for phase_index, duration in overrides.items():
+                logic.phases[phase_index].duration = duration
+            conn.trafficlight.setCompleteRedYellowGreenDefinition(tls_id, logic)
+
+    def activate(self, conn):
+        """Switches every traffic light to the 'ga' program, e.g. after loading a saved state."""
+        for tls_id in self.traffic_light_info:
+            conn.trafficlight.setProgram(tls_id, GA_PROGRAM_ID)
@@ -0,0 +1,71 @@
+# sumo_simulation/warmup.py
+
+import json
+import os
+import sys
+from config import SUMO_CONFIG_DIR, ROUTE_FILE, SUMOCFG_FILE, WARMUP_DURATION, STEP_LENGTH, METRIC_COLLECTION
+from .backends import get_backend
+from .fitness_cache import scenario_fingerprint
+from .sumo_runner import build_sumo_command, worker_directory, METRIC_COLLECTORS
+
+def warmup_prefix(route_file=ROUTE_FILE, sumocfg_file=SUMOCFG_FILE, directory=SUMO_CONFIG_DIR):
+    """
+    Returns the file prefix of the warm-up snapshot for the scenario and settings.
+    The name changes whenever the scenario files or simulation parameters change.
+    """
+    fingerprint = scenario_fingerprint(route_file, sumocfg_file)
+    return os.path.abspath(os.path.join(directory, f"warmup_{fingerprint[:16]}"))
+
+def ensure_warmup_state(route_file=ROUTE_FILE, sumocfg_file=SUMOCFG_FILE, directory=SUMO_CONFIG_DIR):
+    """
+    Returns the warm-up snapshot of the scenario, simulating it first if it is not cached.
+
+    The first WARMUP_DURATION seconds are simulated once with the baseline traffic light
+    programs and saved with SUMO's saveState. The trips completed and in progress at that
+    point are stored next to the state so evaluations can carry them over.
+    The snapshot of the scenario configured by `sumocfg_file` is kept in `directory`.
+    Snapshots of other scenarios are left alone, since concurrent runs may still use them.
+    Returns None if the warm-up is disabled.
+    """
+    if WARMUP_DURATION <= 0:
+        return None
+
+    prefix = warmup_prefix(route_file, sumocfg_file, directory)
+    state_file, metrics_file = prefix + ".state.xml", prefix + ".json"
+    if os.path.exists(state_file) and os.path.exists(metrics_file):
+        print(f"INFO – Using cached warm-up snapshot '{os.path.basename(state_file)}'.")
+        with open(metrics_file) as f:
+            warmup = json.load(f)
+        warmup['state_file'] = state_file
+        return warmup
+
+    print(f"INFO – Simulating a {WARMUP_DURATION}s warm-up with the baseline traffic light programs...")
+    backend = get_backend()
+    try:
+        conn = backend.start(build_sumo_command(worker_directory(0), sumocfg_file=sumocfg_file), label="warmup")
+    except backend.errors as e:
+        print(f"CRITICAL – Could not start SUMO ({backend.name}) for the warm-up. Error: {e}")
+        sys.exit(1)
+
+    steps = int(WARMUP_DURATION / STEP_LENGTH)
+    active_vehicle_data = {}
+    durations, waiting_times = METRIC_COLLECTORS[METRIC_COLLECTION](conn, steps, active_vehicle_data)
+    # Written under process-specific names first, so a concurrent run never reads a partial snapshot.
+    tmp_prefix = f"{prefix}.{os.getpid()}.part"
+    conn.simulation.saveState(tmp_prefix + ".state.xml")
+    conn.close()
+
+    warmup = {
+        'steps': steps,
+        'durations': durations,
+        'waiting_times': waiting_times,
+        'active_vehicles': active_vehicle_data,
+    }
+    with open(tmp_prefix + ".json", 'w') as f:
+        json.dump(warmup, f)
+    os.replace(tmp_prefix + ".state.xml", state_file)
+    os.replace(tmp_prefix + ".json", metrics_file)
+    print(f"INFO – Warm-up snapshot saved to '{os.path.basename(state_file)}'.")
+
+    warmup['state_file'] = state_file
+    return warmup
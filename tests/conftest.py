@@ -0,0 +1,28 @@
+# tests/conftest.py
+
+"""
+The tests run the simulation code against the deterministic TraCI stand-in of
+benchmarks/fake_sumo, each in a scratch working directory (config.py paths are relative).
+"""
+
+import os
+import sys
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARK_DIR = os.path.join(REPO_DIR, "benchmarks")
+
+# The fake traci and sumolib packages must shadow any installed ones.
+sys.path[:0] = [os.path.join(BENCHMARK_DIR, "fake_sumo"), REPO_DIR, BENCHMARK_DIR]
+os.environ.setdefault("SUMO_HOME", os.path.join(BENCHMARK_DIR, "fake_sumo"))
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """A working directory holding the scenario files of a fake network with two traffic lights."""
+    from run_benchmarks import prepare_workspace
+    from sumo_simulation.session import close_sessions
+
+    monkeypatch.chdir(tmp_path)
+    prepare_workspace(str(tmp_path), num_tls=2)
+    yield tmp_path
+    close_sessions()
@@ -0,0 +1,47 @@
+# tests/test_checkpoint.py
+
+import random
+import pytest
+
+pytest.importorskip("numpy")
+
+from genetic_algorithm.checkpoint import save_checkpoint, load_checkpoint, restore_random_state
+from genetic_algorithm.ga_utilities import Fitness
+
+def make_state(**extra):
+    state = {
+        'generation': 3, 'population': [[10, 20], [30, 40]], 'fitnesses': [Fitness(1.5), Fitness(2.5)],
+        'next_population': [[11, 21], [31, 41]], 'best_fitness_history': [2.0, 1.5],
+        'average_fitness_history': [3.0, 2.0], 'best_overall_chromosome': [10, 20],
+        'best_overall_fitness': 1.5, 'racing_cutoff': None,
+    }
+    state.update(extra)
+    return state
+
+def test_checkpoint_records_the_scenario_fingerprint(tmp_path):
+    filename = str(tmp_path / "checkpoint.npz")
+    save_checkpoint(make_state(scenario="abc123"), filename)
+
+    checkpoint = load_checkpoint(filename)
+
+    assert checkpoint['scenario'] == "abc123"
+    assert checkpoint['next_population'] == [[11, 21], [31, 41]]
+
+def test_checkpoint_without_a_scenario_matches_none(tmp_path):
+    filename = str(tmp_path / "checkpoint.npz")
+    save_checkpoint(make_state(), filename)
+
+    assert load_checkpoint(filename)['scenario'] == ""
+
+def test_loading_leaves_the_random_generator_alone_until_restored(tmp_path):
+    filename = str(tmp_path / "checkpoint.npz")
+    random.seed(1)
+    save_checkpoint(make_state(), filename)
+    saved_draw = random.random()
+
+    random.seed(2)
+    checkpoint = load_checkpoint(filename)
+    assert random.getstate() == random.Random(2).getstate()
+
+    restore_random_state(checkpoint)
+    assert random.random() == saved_draw
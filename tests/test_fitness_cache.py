@@ -0,0 +1,42 @@
+# tests/test_fitness_cache.py
+
+import itertools
+import types
+from sumo_simulation import fitness_cache
+from sumo_simulation.fitness_cache import FitnessCache
+
+A, B, C = (30, 30), (40, 40), (50, 50)
+
+def test_memory_keeps_the_most_recently_used_entries(tmp_path):
+    cache = FitnessCache("scenario", str(tmp_path / "cache.sqlite"), memory_size=2)
+    try:
+        cache.put(A, 1.0)
+        cache.put(B, 2.0)
+        cache.get(A)
+        cache.put(C, 3.0)
+        assert [key for _, key in cache._memory] == ["30,30", "50,50"]
+    finally:
+        cache.close()
+
+def test_disk_evicts_the_least_recently_used_entries(tmp_path, monkeypatch):
+    clock = itertools.count()
+    monkeypatch.setattr(fitness_cache, 'time', types.SimpleNamespace(time=lambda: next(clock)))
+    filename = str(tmp_path / "cache.sqlite")
+
+    cache = FitnessCache("scenario", filename, disk_size=2)
+    cache.put(A, 1.0)
+    cache.flush()
+    cache.put(B, 2.0)
+    cache.close()
+
+    # A later run reads A back, so B is now the least recently used entry.
+    cache = FitnessCache("scenario", filename, disk_size=2)
+    assert cache.get(A) == 1.0
+    cache.put(C, 3.0)
+    cache.close()
+
+    cache = FitnessCache("scenario", filename, disk_size=2)
+    try:
+        assert [cache.get(chromosome) for chromosome in (A, B, C)] == [1.0, None, 3.0]
+    finally:
+        cache.close()
@@ -0,0 +1,12 @@
+# tests/test_ga_utilities.py
+
+from genetic_algorithm.ga_utilities import calculate_fitness, fitness_lower_bound, W_DURATION, W_WAITING
+
+def test_fitness_is_normalized_by_the_scenario_vehicle_count():
+    # More vehicles than VEHICLE_COUNT (e.g. a service demand window), all arrived.
+    durations, waiting_times = [100.0] * 1000, [20.0] * 1000
+    fitness = calculate_fitness(durations, waiting_times, 1000, vehicle_count=1000)
+    assert fitness == W_DURATION * 100.0 + W_WAITING * 20.0
+
+    # The racing bound stays below the final fitness.
+    assert fitness_lower_bound(durations[:500], waiting_times[:500], [50.0] * 500, vehicle_count=1000) <= fitness
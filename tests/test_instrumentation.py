@@ -0,0 +1,24 @@
+# tests/test_instrumentation.py
+
+from sumo_simulation.sumo_runner import get_traffic_light_info, evaluate_fitness
+from sumo_simulation.instrumentation import EvaluationTrace, NULL_TRACE
+
+CHROMOSOME = [30, 30, 30, 30]
+
+def traced_counters(metric_collection):
+    trace = EvaluationTrace()
+    evaluate_fitness(CHROMOSOME, get_traffic_light_info(), metric_collection=metric_collection, trace=trace)
+    return trace.to_dict()['counters']
+
+def test_subscription_reads_are_not_counted_as_traci_calls(workspace):
+    subscription, polling = traced_counters('subscription'), traced_counters('polling')
+
+    # Two subscription reads per step, all local.
+    assert subscription['local_calls'] == 2 * subscription['steps']
+    assert polling['local_calls'] == 0
+    # Polling asks SUMO for every vehicle at every step; subscriptions do not.
+    assert subscription['traci_calls'] < 2 * subscription['steps'] < polling['traci_calls']
+
+def test_null_trace_keeps_no_fields():
+    NULL_TRACE.fields.update(worker=3)
+    assert NULL_TRACE.fields == {}
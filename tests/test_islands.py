@@ -0,0 +1,19 @@
+# tests/test_islands.py
+
+import multiprocessing
+import pytest
+from genetic_algorithm import islands
+from genetic_algorithm.islands import run_islands
+from sumo_simulation.sumo_runner import get_traffic_light_info
+
+# The island processes must inherit the patched settings.
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork', reason="needs forked island processes")
+def test_island_runs_with_a_seed_are_reproducible(workspace, monkeypatch):
+    monkeypatch.setattr(islands, 'GA_SEED', 7)
+    monkeypatch.setattr(islands, 'POPULATION_SIZE', 4)
+    monkeypatch.setattr(islands, 'FITNESS_CACHE_ENABLED', False)
+    traffic_light_info = get_traffic_light_info()
+
+    runs = [run_islands(traffic_light_info, [[], []], generations=2) for _ in range(2)]
+    assert runs[0]['histories'] == runs[1]['histories']
+    assert runs[0]['best_chromosome'] == runs[1]['best_chromosome']
@@ -0,0 +1,25 @@
+# tests/test_optimizers.py
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from genetic_algorithm.ga_utilities import Fitness
+from genetic_algorithm.optimizers import Optimizer, DifferentialEvolution
+
+POPULATION = [[10, 20, 30, 40], [20, 30, 40, 50], [30, 40, 50, 60], [40, 50, 60, 5]]
+
+def test_de_races_each_trial_against_its_parent():
+    optimizer = DifferentialEvolution(POPULATION, seed=0)
+    assert optimizer.racing_cutoffs(70.0) == 70.0
+
+    optimizer.tell(POPULATION, [100.0, Fitness(50.0, censored=True), 80.0, Fitness(60.0, tier='screening')])
+    # Parents whose fitness is only a bound or from another tier give no cutoff.
+    assert optimizer.racing_cutoffs(70.0) == [100.0, None, 80.0, None]
+
+def test_optimizer_engines_must_implement_tell():
+    class Incomplete(Optimizer):
+        name = 'incomplete'
+
+    with pytest.raises(TypeError):
+        Incomplete(POPULATION)
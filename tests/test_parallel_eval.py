@@ -0,0 +1,54 @@
+# tests/test_parallel_eval.py
+
+import pytest
+import traci
+from config import SCREENING_TIER
+from sumo_simulation import sumo_runner
+from sumo_simulation.parallel_eval import ParallelEvaluator
+from sumo_simulation.fitness_cache import FitnessCache, scenario_fingerprint
+from sumo_simulation.sumo_runner import get_traffic_light_info, evaluate_fitness
+from genetic_algorithm.ga_utilities import fitness_tier
+
+CHROMOSOME = [30, 30, 30, 30]
+
+def test_each_chromosome_is_raced_against_its_own_cutoff(workspace):
+    evaluator = ParallelEvaluator(get_traffic_light_info(), num_workers=1, instrument=False)
+    try:
+        raced, unraced = evaluator.evaluate([CHROMOSOME, CHROMOSOME], [1.0, None])
+    finally:
+        evaluator.close()
+    assert raced.censored
+    assert not getattr(unraced, 'censored', False)
+    assert unraced > raced
+
+def test_duplicates_are_raced_against_the_loosest_cutoff(workspace):
+    cache = FitnessCache(scenario_fingerprint(), filename=str(workspace / "cache.sqlite"))
+    evaluator = ParallelEvaluator(get_traffic_light_info(), num_workers=1, cache=cache, instrument=False)
+    try:
+        fitnesses = evaluator.evaluate([CHROMOSOME, CHROMOSOME], [1.0, None])
+    finally:
+        evaluator.close()
+    assert evaluator.simulations == 1
+    assert not any(getattr(fitness, 'censored', False) for fitness in fitnesses)
+
+def test_multi_fidelity_needs_a_full_fidelity_evaluation(workspace):
+    evaluator = ParallelEvaluator(get_traffic_light_info(), num_workers=1, instrument=False)
+    try:
+        with pytest.raises(ValueError):
+            evaluator.evaluate_multi_fidelity([CHROMOSOME], top_k=0)
+        assert evaluator.simulations == 0
+    finally:
+        evaluator.close()
+
+class FailingSession:
+    def acquire(self, sumo_cmd):
+        raise traci.TraCIException("SUMO did not start")
+
+    def close(self):
+        pass
+
+def test_a_failed_start_keeps_the_tier_of_the_evaluation(workspace, monkeypatch):
+    monkeypatch.setattr(sumo_runner, 'get_session', lambda worker_id: FailingSession())
+    fitness = evaluate_fitness(CHROMOSOME, get_traffic_light_info(), fidelity=SCREENING_TIER)
+    assert fitness == float('inf')
+    assert fitness_tier(fitness) == 'screening'
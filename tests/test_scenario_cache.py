@@ -0,0 +1,45 @@
+# tests/test_scenario_cache.py
+
+import os
+from config import OSM_FILE, NET_FILE, ROUTE_FILE
+from sumo_simulation import scenario_cache
+
+class FakeTools:
+    """Stands in for netconvert and duarouter, counting how often each one runs."""
+
+    def __init__(self):
+        self.networks = 0
+        self.routes = 0
+
+    def generate_network(self, net_file):
+        self.networks += 1
+        with open(net_file, 'w') as f:
+            f.write('<net/>\n')
+
+    def generate_trips_and_routes(self, net_file, trip_file, route_file, border_edges):
+        self.routes += 1
+        with open(route_file, 'w') as f:
+            f.write(f'<routes><!-- {scenario_cache.VEHICLE_COUNT} vehicles --></routes>\n')
+
+def fake_tools(monkeypatch):
+    tools = FakeTools()
+    monkeypatch.setattr(scenario_cache, 'generate_network', tools.generate_network)
+    monkeypatch.setattr(scenario_cache, 'generate_trips_and_routes', tools.generate_trips_and_routes)
+    monkeypatch.setattr(scenario_cache, 'get_border_edges', lambda net_file: (["a"], ["b"]))
+    return tools
+
+def test_scenario_is_built_once_per_input(workspace, monkeypatch):
+    with open(OSM_FILE, 'w') as f:
+        f.write('<osm/>\n')
+    tools = fake_tools(monkeypatch)
+
+    scenario_cache.ensure_scenario()
+    scenario_cache.ensure_scenario()
+    assert (tools.networks, tools.routes) == (1, 1)
+
+    monkeypatch.setattr(scenario_cache, 'VEHICLE_COUNT', scenario_cache.VEHICLE_COUNT + 1)
+    scenario_cache.ensure_scenario()
+    assert (tools.networks, tools.routes) == (1, 2)
+    with open(ROUTE_FILE) as f:
+        assert f"{scenario_cache.VEHICLE_COUNT} vehicles" in f.read()
+    assert os.path.exists(NET_FILE)
@@ -0,0 +1,35 @@
+# tests/test_steady_state.py
+
+import multiprocessing
+import time
+import pytest
+from sumo_simulation import parallel_eval
+from sumo_simulation.parallel_eval import ParallelEvaluator
+from sumo_simulation.sumo_runner import get_traffic_light_info
+from genetic_algorithm.steady_state import run_steady_state
+
+HUNG = [5, 5, 5, 5]
+
+def _evaluate_or_hang(chromosome, cutoff, fidelity, instrument, timeout=None):
+    if chromosome == HUNG:
+        time.sleep(60)  # A SUMO instance that never answers, and ignores the simulation timeout.
+    stats = {'startups': 0, 'startup_time': 0.0, 'resets': 0, 'reset_time': 0.0}
+    return float(sum(chromosome)), parallel_eval._worker_id, stats, None
+
+# The worker processes must inherit the patched evaluation function.
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork', reason="needs forked worker processes")
+def test_straggler_is_killed_and_only_it_is_abandoned(workspace, monkeypatch):
+    monkeypatch.setattr(parallel_eval, '_evaluate_in_worker', _evaluate_or_hang)
+    evaluator = ParallelEvaluator(get_traffic_light_info(), num_workers=1, instrument=False)
+    population = [HUNG, [10, 20, 30, 40], [20, 30, 40, 50], [30, 40, 50, 60]]
+
+    start = time.monotonic()
+    try:
+        result = run_steady_state(evaluator, population, budget=6, timeout=0.3, concurrency=1)
+    finally:
+        evaluator.close()
+
+    assert result['stragglers'] == 1
+    assert result['evaluations'] == 5
+    assert HUNG not in [chromosome for chromosome, _ in result['population_with_fitness']]
+    assert time.monotonic() - start < 10
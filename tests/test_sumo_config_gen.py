@@ -0,0 +1,53 @@
+# tests/test_sumo_config_gen.py
+
+import pytest
+from sumo_simulation.sumo_config_gen import count_vehicles, departure_times, iter_trips, merge_route_files
+
+def test_count_vehicles(tmp_path):
+    route_file = tmp_path / "window.rou.xml"
+    route_file.write_text(
+        '<routes>\n'
+        '    <vType id="car"/>\n'
+        '    <vehicle id="v0" depart="0"><route edges="a b"/></vehicle>\n'
+        '    <vehicle id="v1" depart="1"><route edges="b c"/></vehicle>\n'
+        '    <trip id="t0" from="a" to="c" depart="2"/>\n'
+        '    <flow id="f0" from="a" to="b" begin="0" end="100" number="5"/>\n'
+        '    <flow id="f1" from="a" to="b" begin="0" end="100" period="10"/>\n'
+        '</routes>\n'
+    )
+    assert count_vehicles(str(route_file)) == 8
+
+def test_departure_times_follow_the_profile_quantiles():
+    assert list(departure_times(4, duration=100)) == [0, 25, 50, 75]
+    # Three times the demand after t=50: the second half holds 3/4 of the vehicles.
+    assert list(departure_times(4, duration=100, profile=[(50, 3.0), (0, 1.0)])) == pytest.approx(
+        [0, 50, 50 + 50 / 3, 50 + 100 / 3]
+    )
+
+def test_trips_never_leave_through_their_entry_edge():
+    trips = list(iter_trips(["a", "b"], ["a", "b", "c"], count=200, seed=1))
+    assert len(trips) == 200
+    assert all(from_edge != to_edge for _, from_edge, to_edge, _ in trips)
+    assert {to_edge for _, _, to_edge, _ in trips} == {"a", "b", "c"}
+    assert [depart for *_, depart in trips] == sorted(depart for *_, depart in trips)
+
+def test_merged_chunks_keep_a_single_vtype(tmp_path):
+    chunks = []
+    for k in range(2):
+        chunk = tmp_path / f"chunk.rou.xml.{k:03d}"
+        chunk.write_text(
+            '<routes>\n'
+            '    <vType id="car"/>\n'
+            f'    <vehicle id="v{2 * k}" depart="{2 * k}"><route edges="a b"/></vehicle>\n'
+            f'    <vehicle id="v{2 * k + 1}" depart="{2 * k + 1}"><route edges="b c"/></vehicle>\n'
+            '</routes>\n'
+        )
+        chunks.append(str(chunk))
+    route_file = str(tmp_path / "merged.rou.xml")
+
+    merge_route_files(chunks, route_file)
+
+    merged = open(route_file).read()
+    assert merged.count("<vType") == 1
+    assert [line.split('"')[1] for line in merged.splitlines() if "<vehicle" in line] == ["v0", "v1", "v2", "v3"]
+    assert count_vehicles(route_file) == 4
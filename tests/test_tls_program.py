@@ -0,0 +1,49 @@
+# tests/test_tls_program.py
+
+import traci
+from sumo_simulation import sumo_runner
+from sumo_simulation.sumo_runner import get_traffic_light_info, evaluate_fitness
+from sumo_simulation.tls_program import TlsProgram
+
+# Includes genes outside [MIN_PHASE_DURATION, MAX_PHASE_DURATION], which both paths clamp.
+CHROMOSOME = [3, 45, 61, 12]
+
+def phase_durations(conn):
+    return {tls_id: [phase.duration for phase in conn.trafficlight.getCompleteRedYellowGreenDefinition(tls_id)[0].phases]
+            for tls_id in conn.trafficlight.getIDList()}
+
+def test_additional_file_matches_traci_programming(workspace):
+    traffic_light_info = get_traffic_light_info()
+    tls_program = TlsProgram(traffic_light_info)
+    program_file = str(workspace / "ga_tls.add.xml")
+    tls_program.write_additional(CHROMOSOME, program_file)
+
+    traci.start(["sumo", "--additional-files", program_file], label="additional")
+    traci.start(["sumo"], label="traci")
+    additional, reprogrammed = traci.getConnection("additional"), traci.getConnection("traci")
+    try:
+        tls_program.apply_traci(reprogrammed, CHROMOSOME)
+        assert phase_durations(additional) == phase_durations(reprogrammed) == {
+            'J0': [5, 3, 45, 3], 'J1': [60, 3, 12, 3]
+        }
+    finally:
+        additional.close()
+        reprogrammed.close()
+
+def test_evaluate_fitness_is_the_same_in_both_modes(workspace):
+    traffic_light_info = get_traffic_light_info()
+    tls_program = TlsProgram(traffic_light_info)
+
+    fitnesses = {mode: evaluate_fitness(CHROMOSOME, traffic_light_info, tls_program=tls_program, tls_program_mode=mode)
+                 for mode in ('additional', 'traci')}
+    assert fitnesses['additional'] == fitnesses['traci']
+
+def test_traffic_light_info_is_read_once_per_network(workspace, monkeypatch):
+    traffic_light_info = get_traffic_light_info()
+
+    def launch_sumo(worker_id=0):
+        raise AssertionError("SUMO launched for a network seen before")
+    monkeypatch.setattr(sumo_runner, 'read_traffic_lights', launch_sumo)
+    assert get_traffic_light_info() == traffic_light_info
+    assert traffic_light_info['J0']['green_phases'] == [0, 2]
+    assert [phase.state for phase in traffic_light_info['J0']['all_phases']] == ["GGrr", "yyrr", "rrGG", "rryy"]